@@ -5,6 +5,9 @@ import time
 import random
 import sys
 
+from catevents import EventEmitter
+from catui import Composer, UIDispatcher, thought_header
+
 # =============================================================================
 # CAT R1 - LOCAL WHITEPAPER ARCHITECTURE
 # Python 3.14 / macOS M-series compatible
@@ -14,6 +17,7 @@ import sys
 class R1LocalLogicEngine:
     def __init__(self):
         self.is_ready = False
+        self.context_length = 4096                # max prompt tokens
 
     def boot_sequence(self, status_callback):
         steps = [
@@ -29,8 +33,9 @@ class R1LocalLogicEngine:
         self.is_ready = True
 
     def generate_response(self, query):
+        emit = EventEmitter().emit
         selected = random.sample(range(1, 65), 4)
-        yield ("debug", f"DEBUG: Routing through experts {selected}\n")
+        yield emit("debug", f"DEBUG: Routing through experts {selected}\n")
 
         thoughts = [
             f"Query: '{query}'. Analyzing constraints.",
@@ -45,7 +50,7 @@ class R1LocalLogicEngine:
         current_thought = ""
         for t in thoughts:
             current_thought += f"● {t}\n"
-            yield ("thought", current_thought)
+            yield emit("thought", current_thought)
             time.sleep(0.3)
 
         finals = [
@@ -59,26 +64,37 @@ class R1LocalLogicEngine:
         current = ""
         for char in answer:
             current += char
-            yield ("answer", current)
+            yield emit("answer", current)
             time.sleep(0.01)
+        yield emit("done")
 
 
 class ThinkBlock(tk.Frame):
-    """Collapsible reasoning block — no rogue Tk() calls."""
-    def __init__(self, parent, colors):
+    """Collapsible reasoning block — no rogue Tk() calls.
+
+    Click the header to collapse. While collapsed only the header counter is
+    updated; the thought text is rendered once when it is expanded again.
+    """
+    def __init__(self, parent, colors, collapsed=False):
         super().__init__(parent, bg=colors["bg"], pady=5)
         self.colors = colors
+        self.is_expanded = not collapsed
+        self.content = ""
+        self.dirty = False
 
         # ✅ FIX: use sys.platform instead of tk.Tk().tk.call(...)
         mono = "Menlo" if sys.platform == "darwin" else (
             "Consolas" if sys.platform == "win32" else "DejaVu Sans Mono"
         )
 
-        tk.Label(
-            self, text="▼ Thought Process",
+        self.header = tk.Label(
+            self, text=self.header_text(),
             font=("Arial", 9, "bold italic"),
-            bg=colors["bg"], fg=colors["primary"], anchor="w"
-        ).pack(fill="x")
+            bg=colors["bg"], fg=colors["primary"], anchor="w",
+            cursor="hand2"
+        )
+        self.header.pack(fill="x")
+        self.header.bind("<Button-1>", self.toggle)
 
         self.text_label = tk.Label(
             self, text="",
@@ -87,20 +103,42 @@ class ThinkBlock(tk.Frame):
             justify="left", anchor="w", padx=10, pady=10,
             wraplength=550
         )
-        self.text_label.pack(fill="x", pady=2)
+        if self.is_expanded:
+            self.text_label.pack(fill="x", pady=2)
+
+    def header_text(self):
+        return thought_header(self.content, self.is_expanded)
+
+    def toggle(self, event=None):
+        self.is_expanded = not self.is_expanded
+        if self.is_expanded:
+            if self.dirty:
+                self.text_label.config(text=self.content)
+                self.dirty = False
+            self.text_label.pack(fill="x", pady=2)
+        else:
+            self.text_label.pack_forget()
+        self.header.config(text=self.header_text())
 
     def update_text(self, content):
-        self.text_label.config(text=content)
+        self.content = content
+        self.header.config(text=self.header_text())
+        if self.is_expanded:
+            self.text_label.config(text=content)
+        else:
+            self.dirty = True
 
 
 class CatR1App:
-    def __init__(self, root):
+    def __init__(self, root, collapse_thoughts=False):
         self.root = root
+        self.collapse_thoughts = collapse_thoughts
         self.root.title("Cat R1 - Local Reasoning Engine")
         self.root.geometry("1000x700")
         self.root.configure(bg="#050505")
 
         self.engine = R1LocalLogicEngine()
+        self.ui = UIDispatcher(self.root)
 
         self.colors = {
             "bg":         "#050505",
@@ -172,22 +210,20 @@ class CatR1App:
         input_bar = tk.Frame(self.main_container, bg=self.colors["bg"], pady=20, padx=20)
         input_bar.pack(side="bottom", fill="x")
 
-        self.entry = tk.Entry(
-            input_bar, bg=self.colors["input_bg"], fg="white",
-            insertbackground="white", font=("Arial", 11), relief="flat",
-            highlightthickness=1,
-            highlightbackground=self.colors["border"],
-            highlightcolor=self.colors["primary"]
+        self.composer = Composer(
+            input_bar, on_submit=self.handle_send,
+            context_length=self.engine.context_length,
+            bg=self.colors["input_bg"], fg="white", font=("Arial", 11),
+            accent=self.colors["primary"], border=self.colors["border"]
         )
-        self.entry.pack(side="left", fill="x", expand=True, ipady=8, padx=(0, 10))
-        self.entry.bind("<Return>", lambda e: self.handle_send())
+        self.composer.pack(side="left", fill="x", expand=True, padx=(0, 10))
 
         tk.Button(
             input_bar, text="Send",
             bg=self.colors["primary"], fg="white",
             activebackground="#2563eb", relief="flat",
             font=("Arial", 10, "bold"),
-            command=self.handle_send, padx=20
+            command=self.composer.submit, padx=20
         ).pack(side="right")
 
     def update_status(self, msg):
@@ -214,14 +250,16 @@ class CatR1App:
         return bubble
 
     def handle_send(self):
-        query = self.entry.get().strip()
+        query = self.composer.get().strip()
         if not query or not self.engine.is_ready:
             return
-        self.entry.delete(0, tk.END)
+        self.composer.clear()
         self.add_bubble("YOU", query, False)
-        threading.Thread(target=self.run_inference, args=(query,), daemon=True).start()
+        widgets = self.create_bot_bubble()
+        threading.Thread(target=self.run_inference, args=(query, widgets), daemon=True).start()
 
-    def run_inference(self, query):
+    def create_bot_bubble(self):
+        # Runs on the Tk thread; the worker only ever gets handles to these widgets
         wrapper = tk.Frame(self.scroll_frame, bg=self.colors["bg"], pady=10)
         wrapper.pack(fill="x", anchor="w")
 
@@ -234,7 +272,7 @@ class CatR1App:
                                bg=self.colors["bg"], fg="#10b981")
         debug_label.pack(anchor="w")
 
-        thought_block = ThinkBlock(wrapper, self.colors)
+        thought_block = ThinkBlock(wrapper, self.colors, collapsed=self.collapse_thoughts)
         thought_block.pack(fill="x", anchor="w", pady=5)
 
         answer_label = tk.Label(
@@ -244,18 +282,24 @@ class CatR1App:
             wraplength=600, padx=12, pady=8
         )
         answer_label.pack(anchor="w")
-
-        for mode, content in self.engine.generate_response(query):
-            if mode == "debug":
-                self.root.after(0, lambda c=content: debug_label.config(text=c))
-            elif mode == "thought":
-                self.root.after(0, lambda c=content: thought_block.update_text(c))
-            elif mode == "answer":
-                self.root.after(0, lambda c=content: answer_label.config(text=c))
-            self.root.after(0, lambda: self.canvas.yview_moveto(1.0))
+        self.root.after(10, lambda: self.canvas.yview_moveto(1.0))
+        return debug_label, thought_block, answer_label
+
+    def run_inference(self, query, widgets):
+        debug_label, thought_block, answer_label = widgets
+        setters = {
+            "debug": lambda c: debug_label.config(text=c),
+            "thought": thought_block.update_text,
+            "answer": lambda c: answer_label.config(text=c),
+            "done": lambda c: None,               # the labels already hold the final text
+        }
+        # One coalesced main-thread flush per frame instead of 3 after() calls per token
+        for event in self.engine.generate_response(query):
+            self.ui.update((answer_label, event.kind), setters[event.kind], event.payload)
+            self.ui.update("scroll", self.canvas.yview_moveto, 1.0)
 
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = CatR1App(root)
+    app = CatR1App(root, collapse_thoughts="--collapse-thoughts" in sys.argv)
     root.mainloop()
\ No newline at end of file
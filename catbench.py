@@ -0,0 +1,201 @@
+import importlib.util
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# =============================================================================
+# CAT R1 - HEADLESS UI BENCHMARK
+# Runs each chat app under a virtual X server, scripts N prompts through its
+# real send path with the engine's sleeps removed, and reports frame gaps,
+# total render time and widget growth so the UI variants can be compared.
+#
+#   python catbench.py [messages] [variant ...]
+#
+# Each variant runs in its own process (a fresh Tk, no leftover threads).
+# If $DISPLAY is unset, Xvfb is started for the duration of the run.
+# =============================================================================
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+VARIANTS = {
+    # name: (file, app class, send method, constructor kwargs)
+    "catseek": ("r11.1.py", "CatSeekApp", "send_message", {"store_path": None}),
+    "catseek-text": ("r11.1.py", "CatSeekApp", "send_message", {"store_path": None, "renderer": "text"}),
+    "r1cat": ("r1cat.py", "CatR1App", "handle_send", {}),
+    "catseekr1": ("catseekr1.py", "CatR1App", "send_message", {}),
+}
+PROMPT = "Explain mixture-of-experts routing like I'm a cat."
+HEARTBEAT_MS = 16                                 # the frame the UI is expected to hit
+TIMEOUT = 600                                     # seconds per variant
+
+
+class InstantClock:
+    """Stands in for a module's `time`: sleep() only yields, the rest is real."""
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @staticmethod
+    def sleep(seconds):
+        time.sleep(0)
+
+
+def load(path, name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def busy(app):
+    """True while the app still has generation or UI work in flight."""
+    pool = app.pool
+    if pool.queue_depth or pool.active_count:
+        return True
+    if getattr(app, "streams", None) or getattr(app, "pending_events", None):
+        return True
+    queue = getattr(app, "msg_queue", None)
+    if queue is not None and not queue.empty():
+        return True
+    ui = getattr(app, "ui", None)
+    return bool(ui is not None and ui.pending)
+
+
+def run_variant(name, messages):
+    """Benchmark one variant in this process; returns a dict of results."""
+    import tkinter as tk
+
+    path, class_name, send_name, kwargs = VARIANTS[name]
+    module = load(path, "bench_" + name.replace("-", "_"))
+    module.time = InstantClock()
+    root = tk.Tk()
+    app = getattr(module, class_name)(root, **kwargs)
+    send = getattr(app, send_name)
+
+    gaps = []
+    widgets = {}
+    state = {"sent": 0, "last": None, "start": None, "elapsed": None}
+
+    def heartbeat():
+        now = time.perf_counter()
+        if state["last"] is not None:
+            gaps.append((now - state["last"]) * 1000)
+        state["last"] = now
+        root.after(HEARTBEAT_MS, heartbeat)
+
+    def drive():
+        if not app.engine.is_ready or busy(app):
+            root.after(1, drive)
+            return
+        if state["sent"] == messages:
+            state["elapsed"] = time.perf_counter() - state["start"]
+            widgets["end"] = count_widgets(root)  # sampled after the clock stops
+            root.quit()
+            return
+        if state["start"] is None:
+            widgets["start"] = count_widgets(root)
+            state["start"] = time.perf_counter()
+            state["last"] = None
+            gaps.clear()
+        app.composer.text.insert("1.0", f"{PROMPT} #{state['sent']}")
+        send()                                    # layout happens when Tk gets to it, as in real use
+        state["sent"] += 1
+        root.after(1, drive)
+
+    root.after(0, heartbeat)
+    root.after(0, drive)
+    deadline = root.after(TIMEOUT * 1000, root.quit)
+    root.mainloop()
+    root.after_cancel(deadline)
+    app.on_close()                                # the app's own teardown: pool, watchdog, archives
+
+    if state["elapsed"] is None:
+        return {"variant": name, "error": f"timed out after {state['sent']} messages"}
+    gaps.sort()
+    return {
+        "variant": name,
+        "messages": messages,
+        "total_s": round(state["elapsed"], 3),
+        "per_message_ms": round(1000 * state["elapsed"] / messages, 2),
+        "frame_p50_ms": round(statistics.median(gaps), 2) if gaps else None,
+        "frame_p95_ms": round(gaps[int(len(gaps) * 0.95)], 2) if gaps else None,
+        "frame_max_ms": round(gaps[-1], 2) if gaps else None,
+        "widgets_start": widgets["start"],
+        "widgets_end": widgets["end"],
+        "widgets_per_message": round((widgets["end"] - widgets["start"]) / messages, 2),
+    }
+
+
+def start_xvfb():
+    """Start Xvfb on a free display; returns (process, display) or (None, None)."""
+    if not shutil.which("Xvfb"):
+        return None, None
+    for number in range(99, 130):
+        if os.path.exists(f"/tmp/.X{number}-lock"):
+            continue
+        process = subprocess.Popen(
+            ["Xvfb", f":{number}", "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        time.sleep(0.5)
+        if process.poll() is None:
+            return process, f":{number}"
+    return None, None
+
+
+def main(argv):
+    messages = int(argv[0]) if argv and argv[0].isdigit() else 50
+    names = [a for a in argv if a in VARIANTS] or list(VARIANTS)
+
+    xvfb = None
+    env = dict(os.environ)
+    if not env.get("DISPLAY"):
+        xvfb, display = start_xvfb()
+        if xvfb is None:
+            sys.exit("catbench: no $DISPLAY and Xvfb is not installed")
+        env["DISPLAY"] = display
+    home = tempfile.mkdtemp(prefix="catbench-")
+    env["HOME"] = home                            # keep chat archives out of the real home
+
+    results = []
+    try:
+        for name in names:
+            child = subprocess.run(
+                [sys.executable, __file__, "--run", name, str(messages)],
+                env=env, cwd=HERE, capture_output=True, text=True, timeout=TIMEOUT + 30
+            )
+            lines = child.stdout.strip().splitlines()
+            if child.returncode or not lines:
+                results.append({"variant": name, "error": (child.stderr.strip().splitlines() or ["crashed"])[-1]})
+            else:
+                results.append(json.loads(lines[-1]))
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+        shutil.rmtree(home, ignore_errors=True)
+
+    columns = ("total_s", "per_message_ms", "frame_p50_ms", "frame_p95_ms", "frame_max_ms",
+               "widgets_start", "widgets_end", "widgets_per_message")
+    print(f"{messages} messages, heartbeat {HEARTBEAT_MS} ms")
+    print(f"{'variant':<14}" + "".join(f"{c:>20}" for c in columns))
+    for result in results:
+        if "error" in result:
+            print(f"{result['variant']:<14}  error: {result['error']}")
+        else:
+            print(f"{result['variant']:<14}" + "".join(f"{str(result[c]):>20}" for c in columns))
+    return results
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        print(json.dumps(run_variant(sys.argv[2], int(sys.argv[3]))))
+    else:
+        main(sys.argv[1:])
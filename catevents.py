@@ -0,0 +1,87 @@
+import time
+
+# =============================================================================
+# CAT R1 - ENGINE EVENTS
+# One set of event types for every consumer of an engine (Tk apps, scripts,
+# servers). Events are small __slots__ records stamped with their request,
+# a per-request sequence number and a perf_counter() timestamp, so queue
+# latency and ordering can be measured wherever they are consumed.
+# =============================================================================
+
+class Event:
+    """Base engine event; subclasses fix `kind`."""
+    __slots__ = ("request_id", "seq", "payload", "timestamp")
+    kind = None
+
+    def __init__(self, request_id, seq, payload=None, timestamp=None):
+        self.request_id = request_id
+        self.seq = seq
+        self.payload = payload
+        self.timestamp = time.perf_counter() if timestamp is None else timestamp
+
+    def __repr__(self):
+        return f"{type(self).__name__}(request_id={self.request_id!r}, seq={self.seq}, payload={self.payload!r})"
+
+
+class DebugEvent(Event):
+    """Diagnostic line from the engine (e.g. expert routing)."""
+    __slots__ = ()
+    kind = "debug"
+
+
+class RouteEvent(Event):
+    """Router decisions so far: a RoutingLog the engine keeps appending to."""
+    __slots__ = ()
+    kind = "route"
+
+
+class ThoughtEvent(Event):
+    """Reasoning trace so far."""
+    __slots__ = ()
+    kind = "thought"
+
+
+class AnswerEvent(Event):
+    """Answer so far, one per generated token.
+
+    The payload is a str or a TokenBuffer the engine keeps appending to;
+    str(payload) is the text either way.
+    """
+    __slots__ = ()
+    kind = "answer"
+
+
+class DoneEvent(Event):
+    """Generation finished; payload is None."""
+    __slots__ = ()
+    kind = "done"
+
+
+EVENT_TYPES = {cls.kind: cls for cls in (DebugEvent, RouteEvent, ThoughtEvent, AnswerEvent, DoneEvent)}
+KINDS = tuple(EVENT_TYPES)                        # also the order events are applied in
+
+
+class EventEmitter:
+    """Creates the events of one request and hands them to `sink`."""
+    __slots__ = ("request_id", "sink", "seq")
+
+    def __init__(self, request_id=None, sink=None):
+        self.request_id = request_id
+        self.sink = sink                          # e.g. queue.put; None to only return them
+        self.seq = 0
+
+    def emit(self, kind, payload=None):
+        event = EVENT_TYPES[kind](self.request_id, self.seq, payload)
+        self.seq += 1
+        if self.sink is not None:
+            self.sink(event)
+        return event
+
+
+def dispatch_table(handler, prefix="on_"):
+    """{kind: bound method} for each on_<kind> method `handler` defines."""
+    return {
+        kind: getattr(handler, prefix + kind)
+        for kind in KINDS
+        if hasattr(handler, prefix + kind)
+    }
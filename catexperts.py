@@ -0,0 +1,128 @@
+import csv
+import json
+import sys
+from array import array
+from collections import deque
+
+# =============================================================================
+# CAT R1 - EXPERT ROUTING STATS
+# The engine appends every router decision (the experts one token was sent
+# to) to a RoutingLog and emits the log itself, like a TokenBuffer, so a
+# coalesced "route" event loses nothing. ExpertWindow folds the decisions
+# it has not seen yet into per-expert counts over a sliding window of
+# recent tokens, O(top-k) per token, for the heatmap and for export.
+# =============================================================================
+
+class RoutingLog:
+    """Append-only router decisions: `active` expert ids per token, flat in an array('H').
+
+    One thread appends (the engine), one thread reads (the UI); a decision
+    goes in with a single extend(), so readers never see half of one.
+    """
+    __slots__ = ("picks", "active")
+
+    def __init__(self, active):
+        self.picks = array("H")
+        self.active = active
+
+    def __len__(self):
+        return len(self.picks) // self.active     # tokens routed
+
+    def append(self, experts):
+        self.picks.extend(experts)
+
+    def last(self):
+        return list(self.picks[-self.active:])
+
+    def since(self, token):
+        """Decisions for the tokens routed after the first `token`, as tuples."""
+        k = self.active
+        stop = len(self) * k
+        picks = self.picks[token * k:stop]
+        return [tuple(picks[i:i + k]) for i in range(0, len(picks), k)]
+
+
+class ExpertWindow:
+    """Per-expert selection counts over the last `window` routed tokens.
+
+    Expert ids are 1-based, as the engine prints them. `totals` keeps the
+    lifetime counts; `version` changes whenever the counts do, so a view
+    can tell whether it has anything to redraw.
+    """
+    def __init__(self, num_experts, window=2048):
+        self.num_experts = num_experts
+        self.window = window
+        self.counts = [0] * num_experts
+        self.totals = [0] * num_experts
+        self.recent = deque()
+        self.tokens = 0
+        self.version = 0
+
+    def add(self, experts):
+        counts = self.counts
+        for expert in experts:
+            counts[expert - 1] += 1
+            self.totals[expert - 1] += 1
+        self.recent.append(experts)
+        if len(self.recent) > self.window:
+            for expert in self.recent.popleft():
+                counts[expert - 1] -= 1
+        self.tokens += 1
+        self.version += 1
+
+    def feed(self, log, start=0):
+        """Add log's decisions from token `start` on; returns the next start."""
+        decisions = log.since(start)
+        for experts in decisions:
+            self.add(experts)
+        return start + len(decisions)
+
+    def imbalance(self):
+        """Busiest expert's load over the mean: 1.0 is perfectly even.
+
+        A batch routed top-k waits on its busiest expert, so this is roughly
+        the slowdown hot-spotting costs against an even spread.
+        """
+        picks = sum(self.counts)
+        if not picks:
+            return 1.0
+        return max(self.counts) * self.num_experts / picks
+
+    def histogram(self):
+        picks = sum(self.counts) or 1
+        return [
+            {"expert": i + 1, "window": count, "share": round(count / picks, 4), "total": self.totals[i]}
+            for i, count in enumerate(self.counts)
+        ]
+
+    def export(self, path):
+        """Write histogram() to `path`: JSON for *.json, CSV otherwise."""
+        rows = self.histogram()
+        with open(path, "w", newline="") as out:
+            if path.lower().endswith(".json"):
+                json.dump({
+                    "window_tokens": len(self.recent),
+                    "window": self.window,
+                    "tokens": self.tokens,
+                    "imbalance": round(self.imbalance(), 3),
+                    "experts": rows,
+                }, out, indent=2)
+            else:
+                writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    import random
+    experts, active = 16, 2
+    bias = [random.gauss(0, 0.5) for _ in range(experts)]
+    log = RoutingLog(active)
+    window = ExpertWindow(experts, window=512)
+    for _ in range(int(sys.argv[1]) if len(sys.argv) > 1 else 5000):
+        scores = sorted(((random.gauss(b, 1.0), e) for e, b in enumerate(bias, 1)), reverse=True)
+        log.append([e for _, e in scores[:active]])
+    window.feed(log)
+    for row in window.histogram():
+        print(f"expert {row['expert']:>2} {row['window']:>5} {'#' * (row['window'] // 8)}")
+    print(f"imbalance {window.imbalance():.2f}x over the last {len(window.recent)} tokens")
@@ -0,0 +1,214 @@
+import re
+import sys
+import time
+
+# =============================================================================
+# CAT R1 - CODE HIGHLIGHTING
+# Small line-at-a-time lexers for fenced code in answers. A line is lexed
+# from the state the previous line ended in (e.g. inside a triple-quoted
+# string), and each language caches (state, line) -> tokens, so a streamed
+# block only ever lexes the line that is still growing.
+# =============================================================================
+
+PY_KEYWORDS = (
+    "False None True and as assert async await break class continue def del elif else "
+    "except finally for from global if import in is lambda nonlocal not or pass raise "
+    "return try while with yield match case"
+).split()
+PY_BUILTINS = (
+    "print len range open int str float list dict set tuple bool type isinstance super "
+    "enumerate zip map filter sorted reversed min max sum abs any all iter next repr "
+    "getattr setattr hasattr object self cls Exception ValueError TypeError KeyError"
+).split()
+SH_KEYWORDS = (
+    "if then else elif fi for while until do done case esac in function select return "
+    "local export readonly source alias unset shift exit"
+).split()
+
+
+def words(names):
+    return r"\b(?:" + "|".join(names) + r")\b"
+
+
+PYTHON = re.compile(
+    r"(?P<comment>#.*)"
+    r"|(?P<open>[rRbBuUfF]{0,2}(?:\"\"\"|'''))"
+    r"|(?P<string>[rRbBuUfF]{0,2}(?:\"(?:\\.|[^\"\\])*\"?|'(?:\\.|[^'\\])*'?))"
+    r"|(?P<decorator>^\s*@[\w.]+)"
+    r"|(?P<keyword>" + words(PY_KEYWORDS) + ")"
+    r"|(?P<builtin>" + words(PY_BUILTINS) + ")"
+    r"|(?P<number>\b(?:0[xXoObB][\da-fA-F_]+|\d[\d_]*\.?\d*(?:[eE][+-]?\d+)?j?)\b)"
+)
+JSON = re.compile(
+    r"(?P<key>\"(?:\\.|[^\"\\])*\"(?=\s*:))"
+    r"|(?P<string>\"(?:\\.|[^\"\\])*\"?)"
+    r"|(?P<number>-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b)"
+    r"|(?P<keyword>\b(?:true|false|null)\b)"
+)
+SHELL = re.compile(
+    r"(?P<comment>(?:^|(?<=\s))#.*)"
+    r"|(?P<string>\"(?:\\.|[^\"\\])*\"?|'[^']*'?)"
+    r"|(?P<variable>\$(?:\{[^}]*\}?|\w+|[@*#?$!0-9]))"
+    r"|(?P<keyword>" + words(SH_KEYWORDS) + ")"
+    r"|(?P<builtin>(?:^|(?<=[|;&]))\s*[\w./-]+)"  # the command of each pipeline stage
+    r"|(?P<option>(?<=\s)--?[\w-]+)"
+)
+
+
+class LineLexer:
+    """Tokenises one language a line at a time.
+
+    lex(line, state) -> (tokens, state), tokens being (text, kind) pairs
+    with kind None for plain text. `state` is None or the delimiter of a
+    string still open at the end of the line (Python triple quotes).
+    """
+    def __init__(self, pattern, max_entries=20000):
+        self.pattern = pattern
+        self.max_entries = max_entries
+        self.cache = {}
+
+    def lex(self, line, state=None):
+        key = (state, line)
+        hit = self.cache.get(key)
+        if hit is None:
+            if len(self.cache) >= self.max_entries:
+                self.cache.clear()
+            hit = self.cache[key] = self.lex_uncached(line, state)
+        return hit
+
+    def lex_uncached(self, line, state):
+        tokens = []
+        pos = 0
+        if state:
+            close = line.find(state)
+            if close < 0:
+                return ((line, "string"),), state
+            pos = close + len(state)
+            tokens.append((line[:pos], "string"))
+            state = None
+        while pos < len(line):
+            match = self.pattern.search(line, pos)
+            if match is None:
+                break
+            if match.start() > pos:
+                tokens.append((line[pos:match.start()], None))
+            kind = match.lastgroup
+            if kind == "open":
+                quote = match.group()[-3:]
+                close = line.find(quote, match.end())
+                if close < 0:
+                    tokens.append((line[match.start():], "string"))
+                    return tuple(tokens), quote
+                kind, end = "string", close + 3
+            else:
+                end = match.end()
+            if end == match.start():              # zero-width match: step past it
+                end += 1
+                kind = None
+            tokens.append((line[match.start():end], kind))
+            pos = end
+        if pos < len(line):
+            tokens.append((line[pos:], None))
+        return tuple(tokens), state
+
+
+HIGHLIGHTERS = {}
+for names, lexer in (
+    (("python", "py", "python3"), LineLexer(PYTHON)),
+    (("json", "jsonc"), LineLexer(JSON)),
+    (("sh", "bash", "shell", "zsh", "console"), LineLexer(SHELL)),
+):
+    for name in names:
+        HIGHLIGHTERS[name] = lexer
+
+# Colours for the code_* tags, on the dark code-block background
+TOKEN_COLORS = {
+    "keyword": "#c084fc",
+    "builtin": "#38bdf8",
+    "string": "#86efac",
+    "comment": "#64748b",
+    "number": "#fbbf24",
+    "decorator": "#f472b6",
+    "key": "#7dd3fc",
+    "variable": "#fb923c",
+    "option": "#fcd34d",
+}
+
+
+def lexer_for(language):
+    return HIGHLIGHTERS.get(language.lower())
+
+
+def benchmark(chunk_size=4, repeat=200):
+    """Mean and 99th-percentile ms per streamed chunk for parsing + lexing a code answer.
+
+    Runs without Tk: it measures the work done per delta before any insert.
+    """
+    from catmarkdown import MarkdownStream
+
+    sample = (
+        "Here is the fix:\n```python\n@cache\ndef fib(n: int) -> int:\n"
+        "    \"\"\"Return the n-th Fibonacci number.\n    Uses memoisation.\"\"\"\n"
+        "    if n < 2:  # base case\n        return n\n    return fib(n - 1) + fib(n - 2)\n```\n"
+        "And the config:\n```json\n{\"model\": \"cat-r1\", \"experts\": [1, 7], \"deep\": true}\n```\n"
+        "```bash\nexport CAT_HOME=\"$HOME/.catr1\"  # data dir\npython r11.1.py --text | tee log.txt\n```\n"
+    ) * 20
+    times = []
+    for _ in range(repeat):
+        stream = MarkdownStream()
+        for i in range(0, len(sample), chunk_size):
+            start = time.perf_counter()
+            stream.feed(sample[i:i + chunk_size])
+            stream.tail_spans()
+            times.append(time.perf_counter() - start)
+    times.sort()
+    return 1000 * sum(times) / len(times), 1000 * times[int(len(times) * 0.99)]
+
+
+class InsertCounter:
+    """Stands in for a tk.Text: keeps only mark offsets and counts inserted chars."""
+    def __init__(self):
+        self.marks = {"end": 0}
+        self.gravity = {}
+        self.size = 0
+        self.inserted = 0
+
+    def mark_set(self, name, index):
+        self.marks[name] = self.marks[index]
+
+    def mark_gravity(self, name, gravity):
+        self.gravity[name] = gravity
+
+    def insert(self, index, chunk, tags=()):
+        at = self.marks[index]
+        for name, pos in self.marks.items():
+            if pos > at or (pos == at and self.gravity.get(name, "right") == "right"):
+                self.marks[name] = pos + len(chunk)
+        self.size += len(chunk)
+        self.inserted += len(chunk)
+
+    def delete(self, first, last):
+        start, stop = self.marks[first], self.marks[last]
+        for name, pos in self.marks.items():
+            self.marks[name] = pos - max(0, min(pos, stop) - start)
+        self.size -= stop - start
+
+
+def insert_volume(line_length=80_000, chunk_size=4):
+    """Chars handed to Text.insert streaming one long json line, per char of answer."""
+    from catmarkdown import MarkdownRenderer
+
+    answer = "```json\n" + ("{\"k\": [1, 2, 3], " * line_length)[:line_length] + "\n```\n"
+    text = InsertCounter()
+    renderer = MarkdownRenderer(text, "end", "tail")
+    for i in range(chunk_size, len(answer) + chunk_size, chunk_size):
+        renderer.update(answer[:i])
+    renderer.finish()
+    return text.inserted / len(answer)
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    mean, p99 = benchmark(size)
+    print(f"{size}-char chunks: mean {mean:.4f} ms, p99 {p99:.4f} ms per chunk")
+    print(f"80 KB json line in {size}-char chunks: {insert_volume(chunk_size=size):.2f} chars inserted per char")
@@ -0,0 +1,60 @@
+# =============================================================================
+# CAT R1 - PREFIX SUMS
+# One Fenwick tree for everything that needs running totals over a growing
+# list: row heights in the virtual transcript, leaf lengths in the rope.
+# =============================================================================
+
+class PrefixSums:
+    """Fenwick tree over a list of ints: O(log n) update, prefix sum and search."""
+    def __init__(self):
+        self.values = []
+        self.tree = [0]
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value):
+        self.values.append(value)
+        i = len(self.values)
+        # tree[i] covers items (i - lowbit(i), i]
+        self.tree.append(value + self.prefix(i - 1) - self.prefix(i - (i & -i)))
+
+    def rebuild(self, values):
+        """Replace every value at once in O(n)."""
+        self.values = list(values)
+        self.tree = [0] + self.values
+        for i in range(1, len(self.tree)):
+            parent = i + (i & -i)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[i]
+
+    def set(self, index, value):
+        delta = value - self.values[index]
+        self.values[index] = value
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count):
+        """Sum of the first `count` values (for row heights: the y offset of row `count`)."""
+        total = 0
+        while count > 0:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+
+    def total(self):
+        return self.prefix(len(self.values))
+
+    def find(self, offset):
+        """Index i with prefix(i) <= offset < prefix(i + 1), clamped to the last item."""
+        pos, rest = 0, offset
+        step = 1 << len(self.values).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self.tree) and self.tree[nxt] <= rest:
+                pos = nxt
+                rest -= self.tree[nxt]
+            step >>= 1
+        return min(pos, len(self.values) - 1)
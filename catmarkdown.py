@@ -0,0 +1,219 @@
+import re
+
+from cathighlight import TOKEN_COLORS, lexer_for
+from catrope import Rope
+
+# =============================================================================
+# CAT R1 - STREAMING MARKDOWN
+# Answers arrive a few characters at a time. The parser only ever looks at
+# the newest delta: finished lines are styled once and never revisited, and
+# the unfinished line is shown as plain text until its newline arrives, so
+# rendering stays linear in the length of the answer. Inside a fenced block
+# with a known language the growing line is re-lexed on every delta (see
+# cathighlight); completed lines come from the lexer's cache.
+# =============================================================================
+
+HEADING = re.compile(r"(#{1,6})\s+(.*)")
+BULLET = re.compile(r"(\s*)[-*+]\s+(.*)")
+NUMBERED = re.compile(r"(\s*)(\d+[.)])\s+(.*)")
+TAIL_LEX_LIMIT = 400                              # longer unfinished code lines stay plain
+FENCE = re.compile(r"\s*(```|~~~)\s*([\w+#.-]*)\s*$")
+INLINE = re.compile(
+    r"(`+)(.+?)\1"                                # `code`
+    r"|\*\*(.+?)\*\*"                             # **bold**
+    r"|(?<![\w*])\*(?![\s*])(.+?)(?<![\s*])\*(?![\w*])"   # *italic*
+)
+
+
+class MarkdownStream:
+    """Incremental Markdown parser: feed deltas, get back styled spans.
+
+    feed() returns (text, tags) spans for the lines the delta completed;
+    everything after the last newline waits in `partial`. Block state (open
+    code fence) is carried between calls, inline markup is line-scoped.
+    """
+    def __init__(self):
+        self.partial = []                         # chunks of the unfinished line
+        self.partial_len = 0                      # its length, kept without joining
+        self.fence = None                         # marker of the open code fence
+        self.language = ""                        # info string of the open fence
+        self.lexer = None                         # highlighter for the open fence
+        self.code_state = None                    # lexer state after the last code line
+        self.closed = False
+
+    def feed(self, delta):
+        if "\n" not in delta:
+            self.partial.append(delta)
+            self.partial_len += len(delta)
+            return []
+        head, _, rest = delta.rpartition("\n")
+        self.partial.append(head)
+        lines = "".join(self.partial).split("\n")
+        self.partial = [rest] if rest else []
+        self.partial_len = len(rest)
+        spans = []
+        for line in lines:
+            spans.extend(self.line_spans(line, "\n"))
+        return spans
+
+    def close(self):
+        """Spans for the last line, which never gets a newline."""
+        if self.closed:
+            return []
+        self.closed = True
+        line = "".join(self.partial)
+        self.partial = []
+        self.partial_len = 0
+        return self.line_spans(line, "")
+
+    def pending(self):
+        return "".join(self.partial)
+
+    def tail_tags(self):
+        """Tags for the unfinished line while it is shown unparsed."""
+        return ("md_code_block",) if self.fence else ()
+
+    def tail_spans(self):
+        """The unfinished line, lexed from the last completed line's state."""
+        if self.lexer is None or self.partial_len > TAIL_LEX_LIMIT:
+            return [(self.pending(), self.tail_tags())]
+        tokens, _ = self.lexer.lex_uncached(self.pending(), self.code_state)
+        return self.code_spans(tokens, "")
+
+    def code_spans(self, tokens, newline):
+        spans = [
+            (chunk, ("md_code_block", "code_" + kind) if kind else ("md_code_block",))
+            for chunk, kind in tokens
+        ]
+        spans.append((newline, ("md_code_block",)))
+        return spans
+
+    def line_spans(self, line, newline):
+        fence = FENCE.match(line)
+        if fence and (self.fence is None or fence.group(1) == self.fence):
+            if self.fence is None:
+                self.fence, self.language = fence.group(1), fence.group(2).lower()
+                self.lexer = lexer_for(self.language)
+            else:
+                self.fence, self.language, self.lexer = None, "", None
+            self.code_state = None
+            return []                             # the fence line itself is not shown
+        if self.fence:
+            if self.lexer is None:
+                return [(line + newline, ("md_code_block",))]
+            tokens, self.code_state = self.lexer.lex(line, self.code_state)
+            return self.code_spans(tokens, newline)
+
+        match = HEADING.match(line)
+        if match:
+            level = min(len(match.group(1)), 3)
+            return self.inline(match.group(2), (f"md_h{level}",)) + [(newline, (f"md_h{level}",))]
+        match = BULLET.match(line)
+        if match:
+            indent, body = match.groups()
+            return [(indent + "• ", ("md_list", "md_marker"))] + self.inline(body, ("md_list",)) + [(newline, ("md_list",))]
+        match = NUMBERED.match(line)
+        if match:
+            indent, number, body = match.groups()
+            return [(f"{indent}{number} ", ("md_list", "md_marker"))] + self.inline(body, ("md_list",)) + [(newline, ("md_list",))]
+        return self.inline(line, ()) + [(newline, ())]
+
+    def inline(self, text, tags):
+        spans = []
+        pos = 0
+        for match in INLINE.finditer(text):
+            if match.start() > pos:
+                spans.append((text[pos:match.start()], tags))
+            if match.group(2) is not None:
+                spans.append((match.group(2), tags + ("md_code",)))
+            elif match.group(3) is not None:
+                spans.append((match.group(3), tags + ("md_bold",)))
+            else:
+                spans.append((match.group(4), tags + ("md_italic",)))
+            pos = match.end()
+        if pos < len(text):
+            spans.append((text[pos:], tags))
+        return spans
+
+
+def configure_tags(text, colors, font=("Arial", 11), mono_font="Courier"):
+    """Define the md_* tags on a tk.Text. Call after the widget's own tags
+    so code backgrounds win over bubble backgrounds."""
+    family, size = font[0], font[1]
+    text.tag_configure("md_h1", font=(family, size + 5, "bold"), spacing1=6, spacing3=2)
+    text.tag_configure("md_h2", font=(family, size + 3, "bold"), spacing1=5, spacing3=2)
+    text.tag_configure("md_h3", font=(family, size + 1, "bold"), spacing1=4, spacing3=1)
+    text.tag_configure("md_bold", font=(family, size, "bold"))
+    text.tag_configure("md_italic", font=(family, size, "italic"))
+    text.tag_configure("md_list", lmargin1=10, lmargin2=26)
+    text.tag_configure("md_marker", foreground=colors["primary"])
+    text.tag_configure(
+        "md_code", font=(mono_font, size - 1),
+        background=colors["think_bg"], foreground=colors["text_p"]
+    )
+    text.tag_configure(
+        "md_code_block", font=(mono_font, size - 1),
+        background=colors["think_bg"], foreground=colors["text_p"],
+        lmargin1=12, lmargin2=12
+    )
+    for kind, color in TOKEN_COLORS.items():
+        text.tag_configure("code_" + kind, foreground=color)
+
+
+class MarkdownRenderer:
+    """Streams one growing answer into a tk.Text, ending at mark `end`.
+
+    Finished lines are inserted once, styled. The unfinished line sits
+    plain between mark `tail` and `end` and is replaced when it completes.
+    """
+    def __init__(self, text, end, tail, tags=()):
+        self.text = text
+        self.end = end                            # right gravity: grows with inserts
+        self.tail = tail
+        self.tags = tuple(tags)
+        self.stream = MarkdownStream()
+        self.fed = 0                              # chars of the answer consumed
+        text.mark_set(tail, end)
+        text.mark_gravity(tail, "left")
+
+    def update(self, content):
+        """Render `content`, which must extend what was rendered so far.
+
+        Returns False when it does not (the answer was replaced); the
+        caller clears the region and starts a new renderer.
+        """
+        if len(content) < self.fed or self.stream.closed:
+            return len(content) == self.fed
+        if isinstance(content, Rope):
+            delta = "".join(content.leaves_since(self.fed))   # only the leaves past what is shown
+        else:
+            delta = content[self.fed:]
+        if not delta:
+            return True
+        self.fed = len(content)
+        stream = self.stream
+        spans = stream.feed(delta)
+        if "\n" not in delta and (stream.lexer is None or stream.partial_len > TAIL_LEX_LIMIT):
+            # Plain or over-long unfinished line: append, it is restyled once complete
+            self.text.insert(self.end, delta, self.tags + stream.tail_tags())
+        elif stream.lexer is not None:
+            # Highlighted code: only the growing line is lexed again
+            self.replace_tail(spans, stream.tail_spans())
+        else:                                     # lines completed: restyle them
+            self.replace_tail(spans, [(stream.pending(), stream.tail_tags())])
+        return True
+
+    def finish(self):
+        """Style the last line once the answer is complete."""
+        if not self.stream.closed:
+            self.replace_tail(self.stream.close())
+
+    def replace_tail(self, spans, tail=()):
+        text = self.text
+        text.delete(self.tail, self.end)
+        for chunk, tags in spans:
+            text.insert(self.end, chunk, self.tags + tags)
+        text.mark_set(self.tail, self.end)
+        for chunk, tags in tail:
+            if chunk:
+                text.insert(self.end, chunk, self.tags + tags)
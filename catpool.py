@@ -0,0 +1,115 @@
+import threading
+import time
+import traceback
+from collections import deque
+
+# =============================================================================
+# CAT R1 - GENERATION WORKER POOL
+# One long-lived, bounded set of daemon workers per app instead of a new
+# thread per prompt. Jobs sharing a conversation key run strictly in order.
+# =============================================================================
+
+class GenerationPool:
+    """Bounded executor for generation jobs with per-conversation ordering."""
+    def __init__(self, workers=2, max_pending=32, name="cat-gen"):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending = {}           # key -> deque of (fn, args, kwargs)
+        self._ready = deque()        # keys with work and no job running
+        self._running = set()        # keys with a job currently executing
+        self._depth = 0
+        self._closed = False
+
+        self._threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    @property
+    def queue_depth(self):
+        """Jobs accepted but not yet started."""
+        with self._lock:
+            return self._depth
+
+    @property
+    def active_count(self):
+        """Jobs currently executing on a worker."""
+        with self._lock:
+            return len(self._running)
+
+    @property
+    def accepting(self):
+        """True if submit() would take a job now.
+
+        Only submitting can fill the pool or shut it, so a UI thread that is
+        the sole submitter can check this before committing to a request.
+        """
+        with self._lock:
+            return not self._closed and self._depth < self.max_pending
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Queue fn(*args) behind earlier jobs for the same key.
+
+        Returns False when the pool is full or shut down so the caller can
+        tell the user instead of spawning yet another thread.
+        """
+        with self._lock:
+            if self._closed or self._depth >= self.max_pending:
+                return False
+            jobs = self._pending.get(key)
+            if jobs is None:
+                jobs = self._pending[key] = deque()
+            jobs.append((fn, args, kwargs))
+            self._depth += 1
+            if key not in self._running and len(jobs) == 1:
+                self._ready.append(key)
+                self._wakeup.notify()
+            return True
+
+    def shutdown(self, wait=True, timeout=1.0):
+        """Drop queued jobs and stop the workers.
+
+        Running jobs are not interrupted; with wait=True we give them up to
+        `timeout` seconds in total before returning (workers are daemons, so a
+        long generation never blocks interpreter exit). Never wait from a
+        thread the jobs themselves wait on, such as the Tk thread.
+        """
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+            self._ready.clear()
+            self._depth = 0
+            self._wakeup.notify_all()
+        if wait:
+            deadline = time.monotonic() + timeout
+            for t in self._threads:
+                t.join(max(0.0, deadline - time.monotonic()))
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                while not self._ready and not self._closed:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+                key = self._ready.popleft()
+                fn, args, kwargs = self._pending[key].popleft()
+                self._depth -= 1
+                self._running.add(key)
+
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                if not self._closed:
+                    traceback.print_exc()
+            finally:
+                with self._lock:
+                    self._running.discard(key)
+                    jobs = self._pending.get(key)
+                    if jobs:
+                        self._ready.append(key)
+                        self._wakeup.notify()
+                    elif jobs is not None:
+                        del self._pending[key]
@@ -0,0 +1,175 @@
+import sys
+import time
+
+from catindex import PrefixSums
+
+# =============================================================================
+# CAT R1 - ROPE FOR STREAMED TEXT
+# A growing answer is kept as bounded leaves instead of one str that is
+# copied on every append. Fenwick trees over leaf lengths and newline
+# counts give O(log n) position and line lookups; appends only ever touch
+# the open tail leaf, and a renderer asks for just the leaves past what it
+# already shows (leaves_since).
+# =============================================================================
+
+class Rope:
+    """Append-optimised text: sealed leaves of LEAF chars plus an open tail.
+
+    Appends only touch the tail, which is sealed into a leaf once it fills,
+    so streaming never copies more than LEAF chars. Fenwick trees over the
+    sealed leaves' lengths and newline counts make position and line
+    lookups O(log n). Supports len(), str(), slicing (rope[a:b] -> str)
+    and rope[i] like a str does.
+    """
+    LEAF = 4096
+
+    def __init__(self, text=""):
+        self.leaves = []                          # sealed, never modified again
+        self.sizes = PrefixSums()
+        self.newlines = PrefixSums()
+        self.sealed = 0                           # chars in sealed leaves
+        self.tail = ""
+        self.append(text)
+
+    def __len__(self):
+        return self.sealed + len(self.tail)
+
+    def __str__(self):
+        return "".join(self.leaves) + self.tail
+
+    def __eq__(self, other):
+        if isinstance(other, Rope):
+            other = str(other)
+        return isinstance(other, str) and len(other) == len(self) and str(self) == other
+
+    __hash__ = None
+
+    def append(self, text):
+        self.tail += text
+        while len(self.tail) >= self.LEAF:
+            leaf, self.tail = self.tail[:self.LEAF], self.tail[self.LEAF:]
+            self.leaves.append(leaf)
+            self.sizes.append(len(leaf))
+            self.newlines.append(leaf.count("\n"))
+            self.sealed += len(leaf)
+
+    def locate(self, position):
+        """(leaf index, offset in leaf) of a character position; the tail
+        is leaf index len(leaves)."""
+        if position >= self.sealed:
+            return len(self.leaves), position - self.sealed
+        leaf = self.sizes.find(position)
+        return leaf, position - self.sizes.prefix(leaf)
+
+    def leaf(self, index):
+        return self.leaves[index] if index < len(self.leaves) else self.tail
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return str(self)[key]
+            return self.slice(start, stop)
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("rope index out of range")
+        leaf, offset = self.locate(key)
+        return self.leaf(leaf)[offset]
+
+    def slice(self, start, stop):
+        if start >= stop:
+            return ""
+        if start >= self.sealed:                  # the common case: text near the end
+            return self.tail[start - self.sealed:stop - self.sealed]
+        first, first_offset = self.locate(start)
+        last, last_offset = self.locate(stop - 1)
+        if first == last:
+            return self.leaf(first)[first_offset:last_offset + 1]
+        return "".join(
+            [self.leaves[first][first_offset:]]
+            + self.leaves[first + 1:last]
+            + [self.leaf(last)[:last_offset + 1]]
+        )
+
+    def line_count(self):
+        if not len(self):
+            return 0
+        return self.newlines.prefix(len(self.leaves)) + self.tail.count("\n") + 1
+
+    def line_start(self, line):
+        """Character offset where 0-based `line` starts."""
+        if line <= 0:
+            return 0
+        sealed_lines = self.newlines.prefix(len(self.leaves))
+        if line > sealed_lines:
+            leaf, before, base = len(self.leaves), sealed_lines, self.sealed
+        else:
+            leaf = self.newlines.find(line - 1)   # leaf holding the line-th newline
+            before, base = self.newlines.prefix(leaf), self.sizes.prefix(leaf)
+        text = self.leaf(leaf)
+        index = -1
+        for _ in range(line - before):
+            index = text.index("\n", index + 1)
+        return base + index + 1
+
+    def line(self, line):
+        start = self.line_start(line)
+        if line + 1 >= self.line_count():
+            return self.slice(start, len(self))
+        return self.slice(start, self.line_start(line + 1) - 1)
+
+    def leaves_since(self, position):
+        """The text past `position` as leaf strings: what a renderer that
+        already shows the first `position` characters still needs."""
+        if position >= len(self):
+            return []
+        leaf, offset = self.locate(position)
+        if leaf == len(self.leaves):
+            return [self.tail[offset:]]
+        return [self.leaves[leaf][offset:]] + self.leaves[leaf + 1:] + [self.tail]
+
+
+def benchmark(total, step=4, budget=5.0):
+    """Seconds to stream `total` chars in `step`-char appends, then take the
+    last 100 chars after every append: str += versus Rope.
+
+    Returns (str seconds, rope seconds, str was extrapolated). The str run
+    stops after `budget` seconds and is extrapolated quadratically.
+    """
+    piece = ("mrrp " * (step // 5 + 1))[:step]
+    appends = total // step
+
+    start = time.perf_counter()
+    text = ""
+    done = 0
+    while done < appends:
+        text += piece
+        # keep a second reference, as a UI holding the previous prefix does,
+        # so CPython cannot resize the string in place
+        shown = text
+        tail = text[-100:]
+        done += 1
+        if not done % 1024 and time.perf_counter() - start > budget:
+            break
+    plain = time.perf_counter() - start
+    estimated = done < appends
+    if estimated:
+        plain *= (appends / done) ** 2
+
+    start = time.perf_counter()
+    rope = Rope()
+    for _ in range(appends):
+        rope.append(piece)
+        tail = rope[len(rope) - 100:len(rope)]
+    roped = time.perf_counter() - start
+    del shown, tail
+    return plain, roped, estimated
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 100_000, 10_000_000]
+    for size in sizes:
+        plain, roped, estimated = benchmark(size)
+        mark = "~" if estimated else " "
+        print(f"{size:>10} chars: str += {mark}{plain * 1000:12.1f} ms   rope {roped * 1000:10.1f} ms")
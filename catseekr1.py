@@ -3,6 +3,14 @@ from tkinter import font
 import threading
 import time
 import random
+import os
+import json
+import queue
+import traceback
+import uuid
+
+from catpool import GenerationPool
+from catui import CanvasReflow, Composer, UIDispatcher
 
 # =============================================================================
 # CAT R1 - LOCAL WHITEPAPER ARCHITECTURE (NO-API EDITION)
@@ -18,6 +26,7 @@ class R1LocalLogicEngine:
     """Simulates R1's internal reasoning loops without any network calls."""
     def __init__(self):
         self.is_ready = False
+        self.context_length = 4096                # max prompt tokens
         # Whitepaper stats
         self.total_params = "14B"
         self.active_params = "3B"
@@ -82,6 +91,97 @@ class R1LocalLogicEngine:
             yield current_text
             time.sleep(0.02)
 
+class ChatArchive:
+    """Past conversations, kept as an append-only JSON-lines log.
+
+    Each save appends the whole chat; when a chat id appears more than once
+    the last line wins, so a reopened chat can be saved again without
+    rewriting the file. All file I/O runs on one writer thread that never
+    drops a job: it reads the log first (compacting it once superseded
+    lines outnumber live ones), hands the chats to `on_loaded`, then
+    appends whatever write() queued. close() waits for those appends.
+    """
+    def __init__(self, path, on_loaded=None):
+        self.path = path
+        self.chats = {}                           # id -> chat, oldest first
+        self.jobs = queue.Queue()                 # chats to append; None stops the writer
+        self.thread = threading.Thread(target=self.run, args=(on_loaded,), name="cat-archive", daemon=True)
+        self.thread.start()
+
+    def read(self):
+        chats = {}
+        lines = 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        chat = json.loads(line)
+                    except ValueError:
+                        continue                  # torn last line from a crash
+                    lines += 1
+                    chats.pop(chat["id"], None)
+                    chats[chat["id"]] = chat
+        except OSError:
+            pass
+        return chats, lines
+
+    def compact(self, chats):
+        """Rewrite the log with one line per chat."""
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            for chat in chats.values():
+                f.write(json.dumps(chat) + "\n")
+        os.replace(temp, self.path)
+
+    def run(self, on_loaded):
+        chats, lines = self.read()
+        if lines > 2 * len(chats):
+            try:
+                self.compact(chats)
+            except OSError:
+                traceback.print_exc()
+        if on_loaded is not None:
+            on_loaded(chats)
+        while True:
+            chat = self.jobs.get()
+            if chat is None:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(chat) + "\n")
+            except OSError:
+                traceback.print_exc()
+
+    def loaded(self, chats):
+        """Merge the chats read from disk under those saved since (Tk thread)."""
+        merged = dict(chats)
+        for chat_id, chat in self.chats.items():
+            merged.pop(chat_id, None)
+            merged[chat_id] = chat
+        self.chats = merged
+
+    def save(self, chat_id, messages):
+        chat = {
+            "id": chat_id,
+            "title": next((t for s, t in messages if s == "You"), "Untitled")[:40],
+            "saved": time.time(),
+            "messages": [list(m) for m in messages]
+        }
+        self.chats.pop(chat_id, None)
+        self.chats[chat_id] = chat
+        return chat
+
+    def write(self, chat):
+        """Queue an append; the chat must not be mutated afterwards (save() copies)."""
+        self.jobs.put(chat)
+
+    def close(self, timeout=5.0):
+        """Stop the writer once every queued append is on disk."""
+        self.jobs.put(None)
+        self.thread.join(timeout)
+
+
 class CatR1App:
     def __init__(self, root):
         self.root = root
@@ -90,6 +190,13 @@ class CatR1App:
         self.root.configure(bg="#0d0d0d")
 
         self.engine = R1LocalLogicEngine()
+        self.ui = UIDispatcher(self.root)
+        self.pool = GenerationPool(workers=2)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.chat_id = uuid.uuid4().hex
+        self.conversation = []                    # [sender, text] pairs of the open chat
+        self.dirty = False                        # open chat changed since it was last archived
         
         self.colors = {
             "bg": "#0d0d0d",
@@ -106,6 +213,10 @@ class CatR1App:
         }
 
         self.setup_ui()
+        self.archive = ChatArchive(
+            os.path.join(os.path.expanduser("~"), ".catr1", "catseekr1_chats.jsonl"),
+            on_loaded=lambda chats: self.ui.post(self.on_archive_loaded, chats)
+        )
         threading.Thread(target=self.engine.boot_sequence, args=(self.update_status,), daemon=True).start()
 
     def setup_ui(self):
@@ -163,6 +274,24 @@ class CatR1App:
         sep = tk.Frame(self.sidebar, height=1, bg=self.colors["border"])
         sep.pack(fill="x", pady=15, padx=15)
 
+        # Archived chats, newest first — click to reopen
+        tk.Label(self.sidebar, text="Recent", bg=self.colors["sidebar"], fg=self.colors["text_secondary"], font=("Arial", 9, "bold")).pack(anchor="w", padx=15)
+        self.history_list = tk.Listbox(
+            self.sidebar,
+            bg=self.colors["sidebar"],
+            fg=self.colors["text_primary"],
+            selectbackground=self.colors["border"],
+            selectforeground=self.colors["primary"],
+            activestyle="none",
+            relief="flat",
+            borderwidth=0,
+            highlightthickness=0,
+            height=8
+        )
+        self.history_list.pack(fill="x", padx=15, pady=(5, 0))
+        self.history_list.bind("<<ListboxSelect>>", self.on_history_select)
+        self.history_ids = []
+
         self.status_label = tk.Label(
             self.sidebar,
             text="Powering up...",
@@ -182,34 +311,24 @@ class CatR1App:
         self.msg_frame = tk.Frame(self.msg_canvas, bg=self.colors["bg"])
         self.scrollbar = tk.Scrollbar(self.chat_container, orient="vertical", command=self.msg_canvas.yview, bg=self.colors["border"])
         
-        self.msg_canvas.create_window((0, 0), window=self.msg_frame, anchor="nw")
+        self.frame_window = self.msg_canvas.create_window((0, 0), window=self.msg_frame, anchor="nw")
         self.msg_canvas.configure(yscrollcommand=self.scrollbar.set)
         self.msg_canvas.pack(side="top", fill="both", expand=True, padx=10, pady=10)
         self.scrollbar.pack(side="right", fill="y")
         
-        self.msg_frame.bind("<Configure>", lambda e: self.msg_canvas.configure(scrollregion=self.msg_canvas.bbox("all")))
+        self.wrap = CanvasReflow(self.msg_canvas, self.frame_window, self.msg_frame)
 
         # Input area
         self.input_frame = tk.Frame(self.chat_container, bg=self.colors["bg"], pady=20)
         self.input_frame.pack(side="bottom", fill="x", padx=20)
 
-        self.entry = tk.Entry(
-            self.input_frame,
-            font=("Arial", 11),
-            bg=self.colors["input_bg"],
-            fg=self.colors["text_primary"],
-            insertbackground=self.colors["text_primary"],
-            borderwidth=1,
-            relief="solid",
-            highlightbackground=self.colors["border"],
-            highlightcolor=self.colors["primary"],
-            highlightthickness=1
+        self.composer = Composer(
+            self.input_frame, on_submit=self.send_message,
+            context_length=self.engine.context_length,
+            bg=self.colors["input_bg"], fg=self.colors["text_primary"], font=("Arial", 11),
+            accent=self.colors["primary"], border=self.colors["border"]
         )
-        self.entry.pack(side="left", fill="x", expand=True, ipady=10, padx=(0, 10))
-        self.entry.insert(0, "Ask anything... meow~")
-        self.entry.bind("<FocusIn>", self.clear_placeholder)
-        self.entry.bind("<FocusOut>", self.restore_placeholder)
-        self.entry.bind("<Return>", lambda e: self.send_message())
+        self.composer.pack(side="left", fill="x", expand=True, padx=(0, 10))
 
         # Send button — black bg, blue text
         self.send_btn = tk.Button(
@@ -223,35 +342,84 @@ class CatR1App:
             relief="flat",
             padx=20,
             pady=10,
-            command=self.send_message,
+            command=self.composer.submit,
             borderwidth=0
         )
         self.send_btn.pack(side="right")
 
-        self.placeholder_active = True
-
-    def clear_placeholder(self, event):
-        if self.placeholder_active:
-            self.entry.delete(0, tk.END)
-            self.entry.config(fg=self.colors["text_primary"])
-            self.placeholder_active = False
+    def new_chat(self):
+        """Swap in an empty transcript now; archive and dismantle the old one later."""
+        self.archive_chat()
+        self.chat_id = uuid.uuid4().hex
+        self.conversation = []
+        self.dirty = False
 
-    def restore_placeholder(self, event):
-        if not self.entry.get().strip():
-            self.entry.delete(0, tk.END)
-            self.entry.insert(0, "Ask anything... meow~")
-            self.entry.config(fg=self.colors["text_secondary"])
-            self.placeholder_active = True
+        old_frame = self.msg_frame
+        self.msg_frame = tk.Frame(self.msg_canvas, bg=self.colors["bg"])
+        self.wrap.watch(self.msg_frame)
+        self.msg_canvas.itemconfigure(self.frame_window, window=self.msg_frame)
+        self.msg_canvas.yview_moveto(0)
+        self.wrap.clear()
+        self.root.after_idle(self.teardown, old_frame, old_frame.winfo_children())
 
-    def new_chat(self):
-        for widget in self.msg_frame.winfo_children():
+    def teardown(self, frame, widgets, chunk=25):
+        """Destroy an unmapped transcript a few widgets per idle callback."""
+        for widget in widgets[-chunk:]:
             widget.destroy()
+        del widgets[-chunk:]
+        if widgets:
+            self.root.after_idle(self.teardown, frame, widgets, chunk)
+        else:
+            frame.destroy()
+
+    def archive_chat(self):
+        if self.dirty:
+            chat = self.archive.save(self.chat_id, self.conversation)
+            self.archive.write(chat)
+            self.show_in_history(chat)
+            self.dirty = False
+
+    def on_archive_loaded(self, chats):
+        self.archive.loaded(chats)
+        self.history_list.delete(0, "end")
+        self.history_ids = []
+        for chat in self.archive.chats.values():
+            self.show_in_history(chat)
+
+    def finish_reply(self, chat_id, conversation, entry, text):
+        """Store a finished reply; re-archive its chat if it was closed mid-stream."""
+        entry[1] = text
+        if conversation is self.conversation:
+            self.dirty = True
+        else:
+            self.archive.write(self.archive.save(chat_id, conversation))
+
+    def show_in_history(self, chat):
+        if chat["id"] in self.history_ids:
+            pos = self.history_ids.index(chat["id"])
+            self.history_list.delete(pos)
+            del self.history_ids[pos]
+        self.history_list.insert(0, chat["title"])
+        self.history_ids.insert(0, chat["id"])
+
+    def on_history_select(self, event):
+        selection = self.history_list.curselection()
+        if not selection:
+            return
+        chat = self.archive.chats[self.history_ids[selection[0]]]
+        self.new_chat()
+        self.chat_id = chat["id"]
+        for sender, text in chat["messages"]:
+            self.add_message(sender, text)
+        self.dirty = False                        # unchanged until something new is said
 
     def update_status(self, msg):
         self.root.after(0, lambda: self.status_label.config(text=msg))
 
     def add_message(self, sender, text=""):
         is_user = (sender == "You")
+        self.conversation.append([sender, text])
+        self.dirty = True
         wrapper = tk.Frame(self.msg_frame, bg=self.colors["bg"], pady=8)
         wrapper.pack(fill="x", padx=10)
         
@@ -264,41 +432,51 @@ class CatR1App:
             bg=bubble_color,
             fg=text_color,
             font=("Arial", 10),
-            width=600,
+            width=self.wrap.width,
             justify="left",
             padx=15,
             pady=10,
             borderwidth=0
         )
         bubble.pack(side="right" if is_user else "left")
+        self.wrap.add(bubble, option="width")
         
-        self.root.update_idletasks()
-        self.msg_canvas.yview_moveto(1.0)
+        self.root.after(10, lambda: self.msg_canvas.yview_moveto(1.0))
         return bubble
 
     def send_message(self):
-        if self.placeholder_active:
-            return
-        query = self.entry.get().strip()
+        query = self.composer.get().strip()
         if not query or not self.engine.is_ready:
             return
-        self.entry.delete(0, tk.END)
-        self.restore_placeholder(None)
+        if not self.pool.accepting:
+            self.update_status("Busy: too many queued prompts, try again shortly.")
+            return
+        self.composer.clear()
         self.add_message("You", query)
-        threading.Thread(target=self.run_logic, args=(query,)).start()
-
-    def run_logic(self, query):
         bubble = self.add_message("Cat R1", "Routing experts... :3")
-        
+        self.pool.submit("main", self.run_logic, query, bubble, self.chat_id, self.conversation, self.conversation[-1])
+
+    def on_close(self):
+        self.archive_chat()
+        self.pool.shutdown(wait=False)            # workers may be waiting on this thread
+        self.root.destroy()
+        self.archive.close()
+
+    def run_logic(self, query, bubble, chat_id, conversation, entry):
+        # Worker thread: never touch the bubble directly, only post coalesced updates
+        thinking = False
+        reasoning_text = ""
         for reasoning_text in self.engine.get_whitepaper_reasoning(query):
-            self.root.after(0, lambda t=reasoning_text: bubble.config(text=t))
-            
-            if "<think>" in reasoning_text and "</think>" not in reasoning_text:
-                self.root.after(0, lambda: bubble.config(fg=self.colors["think_text"]))
-            else:
-                self.root.after(0, lambda: bubble.config(fg=self.colors["text_primary"]))
-            
-            self.root.after(0, lambda: self.msg_canvas.yview_moveto(1.0))
+            self.ui.update((bubble, "text"), lambda t=reasoning_text: bubble.config(text=t))
+
+            in_think = "<think>" in reasoning_text and "</think>" not in reasoning_text
+            if in_think != thinking:
+                thinking = in_think
+                color = self.colors["think_text"] if thinking else self.colors["text_primary"]
+                self.ui.update((bubble, "fg"), lambda c=color: bubble.config(fg=c))
+
+            self.ui.update("scroll", self.msg_canvas.yview_moveto, 1.0)
+        self.ui.post(self.finish_reply, chat_id, conversation, entry, reasoning_text)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -309,4 +487,3 @@ if __name__ == "__main__":
         pass
     app = CatR1App(root)
     root.mainloop()
-c
@@ -0,0 +1,200 @@
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import traceback
+
+# =============================================================================
+# CAT R1 - PERSISTENT CHAT STORE
+# SQLite in WAL mode. Writes go through one background thread that commits
+# in batches; the UI thread only ever enqueues. Streaming tokens are never
+# written -- a bot message is stored once, when it is finished.
+# Full-text search uses an FTS5 index kept in sync by triggers, so indexing
+# happens inside the writer's batches, never on the UI thread.
+# =============================================================================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id       INTEGER PRIMARY KEY,
+    title    TEXT NOT NULL,
+    created  REAL NOT NULL,
+    updated  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id              INTEGER PRIMARY KEY,
+    conversation_id INTEGER NOT NULL REFERENCES conversations(id),
+    seq             INTEGER NOT NULL,
+    sender          TEXT NOT NULL,
+    is_bot          INTEGER NOT NULL,
+    text            TEXT NOT NULL,
+    thought         TEXT NOT NULL DEFAULT '',
+    debug           TEXT NOT NULL DEFAULT '',
+    started         REAL,
+    first_token     REAL,
+    finished        REAL,
+    UNIQUE (conversation_id, seq)
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5(
+    text, thought, content='messages', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO message_fts(rowid, text, thought) VALUES (new.id, new.text, new.thought);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO message_fts(message_fts, rowid, text, thought)
+    VALUES ('delete', old.id, old.text, old.thought);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE ON messages BEGIN
+    INSERT INTO message_fts(message_fts, rowid, text, thought)
+    VALUES ('delete', old.id, old.text, old.thought);
+    INSERT INTO message_fts(rowid, text, thought) VALUES (new.id, new.text, new.thought);
+END;
+"""
+
+
+class ChatStore:
+    """Conversation history on disk with batched, off-thread commits."""
+    def __init__(self, path, flush_interval=0.25, max_batch=256):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.ops = queue.Queue()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Reader connection: owned by the thread that created the store (the UI)
+        self.reader = sqlite3.connect(path)
+        self.reader.execute("PRAGMA journal_mode=WAL")
+        self.reader.executescript(SCHEMA)
+        has_fts = self.reader.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'message_fts'"
+        ).fetchone()
+        self.reader.executescript(FTS_SCHEMA)
+        if not has_fts:
+            # Database from before search existed: index what is already there
+            self.reader.execute("INSERT INTO message_fts(message_fts) VALUES ('rebuild')")
+        self.reader.commit()
+
+        self.writer = threading.Thread(target=self.write_loop, name="cat-store", daemon=True)
+        self.writer.start()
+
+    # --- writes (non-blocking, any thread) ---------------------------------
+
+    def save_conversation(self, conversation_id, title):
+        now = time.time()
+        self.ops.put((
+            "INSERT INTO conversations (id, title, created, updated) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET title = excluded.title, updated = excluded.updated",
+            (conversation_id, title, now, now)
+        ))
+
+    def append_message(self, conversation_id, seq, sender, is_bot, text,
+                       thought="", debug="", started=None, first_token=None, finished=None):
+        # Upsert rather than INSERT OR REPLACE: REPLACE's implicit delete would
+        # skip the FTS delete trigger and leave a stale index entry behind
+        self.ops.put((
+            "INSERT INTO messages (conversation_id, seq, sender, is_bot, text, "
+            "thought, debug, started, first_token, finished) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(conversation_id, seq) DO UPDATE SET sender = excluded.sender, "
+            "is_bot = excluded.is_bot, text = excluded.text, thought = excluded.thought, "
+            "debug = excluded.debug, started = excluded.started, "
+            "first_token = excluded.first_token, finished = excluded.finished",
+            (conversation_id, seq, sender, int(is_bot), text, thought, debug,
+             started, first_token, finished)
+        ))
+        self.ops.put((
+            "UPDATE conversations SET updated = ? WHERE id = ?",
+            (time.time(), conversation_id)
+        ))
+
+    def close(self, timeout=2.0):
+        """Flush what is queued and stop the writer."""
+        self.ops.put(None)
+        self.writer.join(timeout)
+        self.reader.close()
+
+    def write_loop(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        running = True
+        while running:
+            batch = [self.ops.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch and batch[-1] is not None:
+                try:
+                    batch.append(self.ops.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                batch.pop()
+                running = False
+            if batch:
+                try:
+                    with conn:                    # one transaction per batch
+                        for sql, params in batch:
+                            conn.execute(sql, params)
+                except sqlite3.Error:
+                    traceback.print_exc()
+        conn.close()
+
+    # --- reads (UI thread) ---------------------------------------------------
+
+    def next_conversation_id(self):
+        (max_id,) = self.reader.execute("SELECT MAX(id) FROM conversations").fetchone()
+        return (max_id or 0) + 1
+
+    def list_conversations(self):
+        """[(id, title, next_seq)], most recently updated first."""
+        return self.reader.execute(
+            "SELECT c.id, c.title, "
+            "(SELECT COALESCE(MAX(m.seq) + 1, 0) FROM messages m WHERE m.conversation_id = c.id) "
+            "FROM conversations c ORDER BY c.updated DESC"
+        ).fetchall()
+
+    def load_messages(self, conversation_id, limit=50, before_seq=None):
+        """The `limit` newest messages older than before_seq, oldest first.
+
+        Rows are (seq, sender, is_bot, text, thought, debug).
+        """
+        if before_seq is None:
+            before_seq = 1 << 62
+        rows = self.reader.execute(
+            "SELECT seq, sender, is_bot, text, thought, debug FROM messages "
+            "WHERE conversation_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+            (conversation_id, before_seq, limit)
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+    def load_messages_from(self, conversation_id, limit=50, from_seq=0):
+        """The `limit` oldest messages with seq >= from_seq, oldest first."""
+        return self.reader.execute(
+            "SELECT seq, sender, is_bot, text, thought, debug FROM messages "
+            "WHERE conversation_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+            (conversation_id, from_seq, limit)
+        ).fetchall()
+
+    def search(self, query, limit=20):
+        """Best matches for `query` across every stored conversation.
+
+        Returns [(conversation_id, seq, sender, title, snippet)], best first.
+        Each word is matched as a prefix, so partial typing already hits.
+        """
+        words = re.findall(r"\w+", query)
+        if not words:
+            return []
+        match = " ".join(f'"{word}"*' for word in words)
+        return self.reader.execute(
+            "SELECT m.conversation_id, m.seq, m.sender, c.title, "
+            "snippet(message_fts, -1, '[', ']', '…', 8) "
+            "FROM message_fts JOIN messages m ON m.id = message_fts.rowid "
+            "JOIN conversations c ON c.id = m.conversation_id "
+            "WHERE message_fts MATCH ? ORDER BY bm25(message_fts) LIMIT ?",
+            (match, limit)
+        ).fetchall()
@@ -0,0 +1,203 @@
+import re
+import sys
+import threading
+from array import array
+
+from catrope import Rope
+
+# =============================================================================
+# CAT R1 - TOKEN BUFFERS
+# Streamed text kept as token ids in array('I') chunks (4 bytes per token)
+# instead of a new str per appended token. Text is decoded lazily and
+# incrementally into a Rope: each view() call only detokenizes the ids
+# added since the last one.
+# =============================================================================
+
+PIECE = re.compile(r" ?\w{1,8}| ?[^\w\s]|\s+")   # word pieces with their leading space
+
+
+class Vocabulary:
+    """Interning word-piece vocabulary: piece <-> id, grown on demand.
+
+    Ids are only meaningful within one process; anything persisted goes
+    out as decoded text. Every piece stays interned for the life of the
+    process, so encode only model output here (a bounded set of pieces),
+    never user prompts. Safe to encode from several threads at once.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.pieces = []
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.pieces)
+
+    def encode(self, text):
+        ids = array("I")
+        for piece in PIECE.findall(text):
+            token = self.ids.get(piece)
+            if token is None:
+                with self.lock:
+                    token = self.ids.get(piece)
+                    if token is None:
+                        token = len(self.pieces)  # reserved before any other thread can append
+                        self.pieces.append(piece) # published before the id is handed out
+                        self.ids[piece] = token
+            ids.append(token)
+        return ids
+
+    def decode(self, ids):
+        pieces = self.pieces
+        return "".join([pieces[token] for token in ids])
+
+
+VOCAB = Vocabulary()
+
+
+class TokenBuffer:
+    """Append-only token ids with a lazily decoded text view.
+
+    Ids live in array('I') chunks of CHUNK ids. Only the last chunk grows;
+    once full it is sealed and never resized again, so tail() can hand out
+    memoryviews of sealed chunks while the engine keeps appending. One
+    thread appends (the engine), any thread reads: `count` is published
+    after the id it covers, and a chunk, once in `chunks`, is never
+    replaced. Appends never copy existing ids and view() never re-decodes
+    old ones.
+    """
+    __slots__ = ("chunks", "count", "vocab", "decoded", "rope")
+    CHUNK = 4096
+
+    def __init__(self, ids=(), vocab=VOCAB):
+        self.chunks = [array("I")]                # all full but the last
+        self.count = 0                            # ids readers may look at
+        self.vocab = vocab
+        self.decoded = 0                          # ids already turned into text
+        self.rope = Rope()                        # the decoded text
+        self.extend(ids)
+
+    def __len__(self):
+        return self.count
+
+    def __str__(self):
+        return self.text()
+
+    def append(self, token):
+        chunk = self.chunks[-1]
+        if len(chunk) == self.CHUNK:
+            chunk = array("I")
+            self.chunks.append(chunk)
+        chunk.append(token)
+        self.count += 1
+
+    def extend(self, tokens):
+        for token in tokens:
+            self.append(token)
+
+    def ids(self, start, stop):
+        """Copy of ids[start:stop] as one array."""
+        out = array("I")
+        while start < stop:
+            chunk, offset = divmod(start, self.CHUNK)
+            take = min(stop - start, self.CHUNK - offset)
+            out.extend(self.chunks[chunk][offset:offset + take])
+            start += take
+        return out
+
+    def tail(self, count):
+        """The last `count` ids as a list of memoryviews, oldest first.
+
+        Sealed chunks are viewed without copying; only the part in the open
+        chunk (under CHUNK ids) is copied, since a view on it would stop the
+        engine from appending. Views stay valid however much is appended.
+        """
+        stop = self.count
+        start = max(0, stop - count)
+        views = []
+        while start < stop:
+            index, offset = divmod(start, self.CHUNK)
+            chunk = self.chunks[index]
+            take = min(stop - start, self.CHUNK - offset)
+            if len(chunk) < self.CHUNK:           # still open: copy, never export it
+                chunk = chunk[offset:offset + take]
+                offset = 0
+            views.append(memoryview(chunk)[offset:offset + take])
+            start += take
+        return views
+
+    def nbytes(self):
+        return sum(chunk.itemsize * chunk.buffer_info()[1] for chunk in self.chunks)
+
+    def view(self):
+        """The text so far as a Rope; decodes only the ids appended since the last call."""
+        count = self.count
+        if count > self.decoded:
+            self.rope.append(self.vocab.decode(self.ids(self.decoded, count)))
+            self.decoded = count
+        return self.rope
+
+    def text(self):
+        return str(self.view())
+
+
+def memory_report(chars=100_000):
+    """Bytes held while streaming a `chars`-long answer, old way vs. buffer."""
+    words = "the quick cat routes tokens through sixty four experts and purrs ".split()
+    text = " ".join(words[i % len(words)] for i in range(chars // 5))[:chars]
+    vocab = Vocabulary()
+    buffer = TokenBuffer(vocab.encode(text), vocab)
+    tokens = len(buffer)
+    # The engine used to publish a fresh prefix str for every token
+    prefix_bytes = sum(sys.getsizeof(text[:i * len(text) // tokens]) for i in range(1, tokens + 1))
+    return {
+        "chars": len(text),
+        "tokens": tokens,
+        "str_bytes": sys.getsizeof(text),
+        "buffer_bytes": buffer.nbytes(),
+        "prefix_strings_bytes": prefix_bytes,
+    }
+
+
+def concurrency_check(tokens=200_000, window=1000):
+    """Append on one thread while another holds tail() views.
+
+    Returns (appended, reads). A view on a growing array would make the
+    appending thread raise BufferError; with sealed chunks it never does.
+    """
+    buffer = TokenBuffer()
+    held = []
+    done = threading.Event()
+
+    def read():
+        reads = 0
+        while not done.is_set():
+            views = buffer.tail(window)
+            held.append(views)                    # keep them alive across appends
+            del held[:-8]
+            reads += 1
+        return reads
+
+    reads = []
+    reader = threading.Thread(target=lambda: reads.append(read()))
+    reader.start()
+    try:
+        for token in range(tokens):
+            buffer.append(token)
+    finally:
+        done.set()
+        reader.join()
+    last = [token for view in buffer.tail(window) for token in view]
+    assert last == list(range(tokens - window, tokens)), "tail() returned the wrong ids"
+    return len(buffer), reads[0]
+
+
+if __name__ == "__main__":
+    appended, reads = concurrency_check()
+    print(f"{appended} appends while {reads} tail() views were held: no BufferError")
+    for size in (1_000, 10_000, 100_000):
+        report = memory_report(size)
+        print(
+            f"{report['chars']:>7} chars {report['tokens']:>6} tokens: "
+            f"str {report['str_bytes']:>8} B, ids {report['buffer_bytes']:>8} B, "
+            f"per-token prefixes {report['prefix_strings_bytes'] / 2**20:8.1f} MiB"
+        )
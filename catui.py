@@ -0,0 +1,464 @@
+import re
+import sys
+import threading
+import time
+import tkinter as tk
+import traceback
+from tkinter import font as tkfont
+
+# =============================================================================
+# CAT R1 - SHARED TK HELPERS
+# Small pieces of UI plumbing reused by the desktop variants.
+# =============================================================================
+
+class UIDispatcher:
+    """Funnels UI work from worker threads into one Tk callback per frame.
+
+    Workers never touch widgets directly: they hand callables to update(),
+    which are run on the Tk thread by a single after() callback per frame.
+    Updates that share a key are coalesced so only the newest one runs -- a
+    label that received 40 tokens since the last frame is configured once.
+    """
+    def __init__(self, root, interval=16):
+        self.root = root
+        self.interval = interval                  # ms between flushes (~60 fps)
+        self.lock = threading.Lock()
+        self.pending = {}                         # key -> (fn, args), in posting order
+        self.scheduled = False
+
+    def update(self, key, fn, *args):
+        """Run fn(*args) next frame, replacing any queued call with the same key."""
+        with self.lock:
+            self.pending.pop(key, None)           # newest call moves to the back
+            self.pending[key] = (fn, args)
+            if self.scheduled:
+                return
+            self.scheduled = True
+        try:
+            self.root.after(self.interval, self.flush)
+        except (tk.TclError, RuntimeError):
+            pass                                  # window already closed
+
+    def post(self, fn, *args):
+        """Run fn(*args) next frame; never coalesced with other calls."""
+        self.update(object(), fn, *args)
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.scheduled = False
+        for fn, args in pending.values():
+            try:
+                fn(*args)
+            except tk.TclError:
+                pass                              # target widget was destroyed
+
+
+class Debouncer:
+    """Collapses a burst of calls into one call `delay` ms after the last."""
+    def __init__(self, widget, delay, fn):
+        self.widget = widget
+        self.delay = delay
+        self.fn = fn
+        self.job = None
+
+    def __call__(self, *args):
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+        self.job = self.widget.after(self.delay, self.fire, *args)
+
+    def fire(self, *args):
+        self.job = None
+        self.fn(*args)
+
+
+class CanvasReflow:
+    """Keeps a frame embedded in a canvas as wide as the canvas, its widgets wrapped to match.
+
+    Resizes come in bursts while dragging, so the width settles for
+    `delay` ms before every registered widget is touched; the scrollregion
+    follows the frame's size the same way.
+    """
+    def __init__(self, canvas, window, frame, width=600, delay=120):
+        self.canvas = canvas
+        self.window = window                      # canvas item holding the frame
+        self.width = width                        # current wrap width
+        self.widgets = []                         # (widget, option, offset)
+        self.sync_scrollregion = Debouncer(
+            canvas, 30, lambda: canvas.configure(scrollregion=canvas.bbox("all"))
+        )
+        self.watch(frame)
+        canvas.bind("<Configure>", Debouncer(canvas, delay, lambda e: self.reflow(e.width)))
+
+    def watch(self, frame):
+        """Track `frame`'s size in the scrollregion (again after swapping frames)."""
+        frame.bind("<Configure>", lambda e: self.sync_scrollregion())
+
+    def add(self, widget, offset=0, option="wraplength"):
+        """Re-wrap `widget` to width + offset from now on, through `option`."""
+        self.widgets.append((widget, option, offset))
+
+    def prune(self):
+        self.widgets = [entry for entry in self.widgets if entry[0].winfo_exists()]
+
+    def clear(self):
+        self.widgets = []
+
+    def reflow(self, width):
+        self.canvas.itemconfigure(self.window, width=width)
+        wrap_width = max(200, int(width * 0.75))
+        if wrap_width == self.width:
+            return
+        self.width = wrap_width
+        for widget, option, offset in self.widgets:
+            widget.config({option: wrap_width + offset})
+
+
+class TextMeasurer:
+    """Pixel widths of strings in one font, cached per string.
+
+    Re-wrapping the same text at a new width only sums cached word widths,
+    it never asks Tk to measure unchanged text again.
+    """
+    def __init__(self, font, max_entries=65536):
+        self.font = tkfont.Font(font=font)
+        self.max_entries = max_entries
+        self.cache = {}
+        self.space = self.measure(" ")
+
+    def measure(self, string):
+        width = self.cache.get(string)
+        if width is None:
+            if len(self.cache) >= self.max_entries:
+                self.cache.clear()
+            width = self.cache[string] = self.font.measure(string)
+        return width
+
+    def count_lines(self, text, wrap_width):
+        """Lines `text` takes when word-wrapped at wrap_width pixels."""
+        lines = 0
+        for paragraph in text.split("\n"):
+            lines += 1
+            if not paragraph or self.measure(paragraph) <= wrap_width:
+                continue
+            used = 0
+            for word in paragraph.split(" "):
+                width = self.measure(word)
+                if used and used + self.space + width > wrap_width:
+                    lines += 1
+                    used = width
+                else:
+                    used += (self.space if used else 0) + width
+        return lines
+
+
+class StallWatchdog:
+    """Notices when the Tk thread stops servicing after() callbacks.
+
+    While armed, the Tk thread stamps a heartbeat every `interval` ms and a
+    daemon thread checks the stamp; once it is `threshold` seconds overdue,
+    the Tk thread's current stack (from sys._current_frames) is printed to
+    stderr together with whatever context() returns. Disarmed, neither
+    thread wakes up. arm() holds it armed until disarm() (e.g. while
+    something streams); poke() arms it for `quiet` beats, for synchronous
+    work and user input (see watch_input). Create and arm it on the Tk thread.
+    """
+    def __init__(self, root, threshold=0.5, interval=100, context=None, quiet=5):
+        self.root = root
+        self.threshold = threshold
+        self.interval = interval
+        self.context = context                    # () -> dict, called off the Tk thread
+        self.tk_thread = threading.get_ident()
+        self.lock = threading.Lock()
+        self.last_beat = time.monotonic()
+        self.stall_started = None                 # beat time of the stall being reported
+        self.stalls = 0
+        self.stall_total = 0.0
+        self.stall_max = 0.0
+        self.stopped = threading.Event()
+        self.armed = threading.Event()
+        self.job = None
+        self.held = False                         # armed by arm(), not just poked
+        self.quiet = quiet                        # beats a poke keeps it armed
+        self.quiet_beats = 0
+        threading.Thread(target=self.watch, name="cat-watchdog", daemon=True).start()
+
+    def arm(self):
+        self.held = True
+        self.start()
+
+    def disarm(self):
+        """Release arm(); the heartbeat stops after `quiet` more beats."""
+        self.held = False
+        self.quiet_beats = 0
+
+    def poke(self):
+        """Watch the next `quiet` beats: call before work that may block the loop."""
+        self.quiet_beats = 0
+        self.start()
+
+    def watch_input(self, widget):
+        """poke() on every key and button press anywhere in the application.
+
+        "all" bindings run after the widget's own, so this covers what the
+        input sets off (redraws, after() work), not the handler itself;
+        poke() before slow synchronous handlers.
+        """
+        widget.bind_all("<KeyPress>", lambda e: self.poke(), add="+")
+        widget.bind_all("<ButtonPress>", lambda e: self.poke(), add="+")
+
+    def start(self):
+        if self.job is not None or self.stopped.is_set():
+            return
+        with self.lock:
+            self.last_beat = time.monotonic()
+        self.job = self.root.after(self.interval, self.beat)
+        self.armed.set()
+
+    def halt(self):
+        if self.job is None:
+            return
+        self.armed.clear()
+        self.root.after_cancel(self.job)
+        self.job = None
+        with self.lock:
+            self.stall_started = None
+
+    def beat(self):
+        now = time.monotonic()
+        with self.lock:
+            if self.stall_started is not None:
+                duration = now - self.stall_started - self.interval / 1000
+                self.stall_started = None
+                self.stalls += 1
+                self.stall_total += duration
+                self.stall_max = max(self.stall_max, duration)
+                print(f"[watchdog] Tk loop recovered after {duration * 1000:.0f} ms", file=sys.stderr)
+            self.last_beat = now
+        if not self.held:
+            self.quiet_beats += 1
+            if self.quiet_beats >= self.quiet:
+                self.halt()                       # cancelling the job that just ran is a no-op
+                return
+        self.job = self.root.after(self.interval, self.beat)
+
+    def watch(self):
+        while True:
+            self.armed.wait()
+            if self.stopped.wait(self.interval / 2000):
+                return
+            with self.lock:
+                if not self.armed.is_set():
+                    continue
+                overdue = time.monotonic() - self.last_beat - self.interval / 1000
+                if overdue < self.threshold or self.stall_started is not None:
+                    continue
+                self.stall_started = self.last_beat
+            self.report(overdue)
+
+    def report(self, overdue):
+        frame = sys._current_frames().get(self.tk_thread)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "  (no frame)\n"
+        try:
+            context = self.context() if self.context else {}
+        except Exception as exc:                  # the Tk thread may be mid-update
+            context = {"context_error": repr(exc)}
+        details = "".join(f"  {key}: {value}\n" for key, value in context.items())
+        print(
+            f"[watchdog] Tk loop stalled for {overdue * 1000:.0f} ms\n{details}"
+            f"  Tk thread stack:\n{stack}",
+            file=sys.stderr
+        )
+
+    def metrics(self):
+        """Stall counters; the stall in progress, if any, is in `stalled_ms`."""
+        with self.lock:
+            current = 0.0
+            if self.stall_started is not None:
+                current = time.monotonic() - self.stall_started - self.interval / 1000
+            return {
+                "stalls": self.stalls,
+                "stall_total_ms": self.stall_total * 1000,
+                "stall_max_ms": self.stall_max * 1000,
+                "stalled_ms": current * 1000,
+            }
+
+    def stop(self):
+        self.stopped.set()
+        self.armed.set()                          # lets the watch thread see stopped
+        if self.job is not None:
+            try:
+                self.root.after_cancel(self.job)
+            except tk.TclError:
+                pass
+            self.job = None
+
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text):
+    """Rough BPE-style token count: ~4 characters per word piece, one per symbol."""
+    return sum((len(piece) + 3) // 4 for piece in TOKEN_PATTERN.findall(text))
+
+
+def thought_header(content, expanded):
+    """Header text for a thought block, with a live line/token counter."""
+    title = "▼ Thought Process" if expanded else "▶ Show Thoughts"
+    if not content:
+        return title
+    lines = content.count("\n") or 1
+    return f"{title}  ·  {lines} lines · ~{len(content) // 4} tokens"
+
+
+class Composer(tk.Frame):
+    """Multi-line prompt box with a live context-usage meter.
+
+    Return sends, Shift+Return adds a line. Pastes are inserted in chunks
+    from after() callbacks so a large document never freezes the window,
+    and tokens are counted on a background thread once typing pauses.
+    submit() refuses prompts that do not fit in `context_length`.
+    """
+    PASTE_CHUNK = 32768                           # chars inserted per Tk callback
+
+    def __init__(self, parent, on_submit, context_length=None, bg="#0f172a", fg="white",
+                 accent="#3b82f6", border="#1e293b", font=("Arial", 12), height=3, watchdog=None):
+        super().__init__(parent, bg=parent.cget("bg"))
+        self.on_submit = on_submit
+        self.watchdog = watchdog                  # StallWatchdog poked around submit
+        self.context_length = context_length
+        self.accent = accent
+        self.tokens = 0
+        self.generation = 0                       # bumped on every edit
+        self.counted = -1                         # generation `tokens` belongs to
+        self.paste_job = None
+        self.ui = UIDispatcher(self)
+        self.count_lock = threading.Lock()
+        self.count_wakeup = threading.Event()
+        self.count_request = None                 # (generation, text) for the counter thread
+        self.count_later = Debouncer(self, 250, self.request_count)
+
+        self.text = tk.Text(
+            self, height=height, wrap="word", undo=True,
+            bg=bg, fg=fg, insertbackground=fg, font=font,
+            relief="flat", padx=10, pady=8,
+            highlightthickness=1, highlightbackground=border, highlightcolor=accent
+        )
+        self.text.pack(side="top", fill="x", expand=True)
+        self.meter = tk.Label(self, text="", font=("Arial", 8), bg=self.cget("bg"), fg="#64748b", anchor="e")
+        self.meter.pack(side="top", fill="x")
+
+        self.text.bind("<Return>", self.on_return)
+        self.text.bind("<Shift-Return>", lambda e: None)   # falls through to Tk's newline
+        self.text.bind("<<Paste>>", self.on_paste)
+        self.text.bind("<<Modified>>", self.on_modified)
+
+        threading.Thread(target=self.count_loop, name="cat-tokens", daemon=True).start()
+        self.show_meter()
+
+    # --- public API -----------------------------------------------------------
+
+    def get(self):
+        return self.text.get("1.0", "end-1c")
+
+    def clear(self):
+        self.text.delete("1.0", "end")
+        self.text.edit_reset()
+
+    def focus_set(self):
+        self.text.focus_set()
+
+    def submit(self):
+        if self.watchdog is not None:
+            self.watchdog.poke()                  # a stale count and on_submit run right here
+        if self.paste_job is not None:
+            return                                # still pasting
+        text = self.get()
+        if not text.strip():
+            return
+        if self.counted != self.generation:
+            self.tokens = count_tokens(text)      # stale count: never guess at send time
+            self.counted = self.generation
+            self.show_meter()
+        if self.context_length and self.tokens > self.context_length:
+            self.meter.config(
+                text=f"Prompt is ~{self.tokens:,} tokens; the context window is "
+                     f"{self.context_length:,}. Shorten it to send.",
+                fg="#ef4444"
+            )
+            return
+        self.on_submit()
+
+    # --- input handling -------------------------------------------------------
+
+    def on_return(self, event):
+        self.submit()
+        return "break"
+
+    def on_modified(self, event):
+        if self.text.edit_modified():
+            self.text.edit_modified(False)
+            self.generation += 1
+            self.count_later()
+
+    def on_paste(self, event):
+        try:
+            data = self.clipboard_get()
+        except tk.TclError:
+            return "break"
+        if len(data) <= self.PASTE_CHUNK:
+            return                                # small: Tk's own paste is fine
+        try:
+            self.text.delete("sel.first", "sel.last")
+        except tk.TclError:
+            pass                                  # no selection to replace
+        self.text.mark_set("paste", "insert")
+        self.text.mark_gravity("paste", "right")
+        self.paste_chunk(data, 0)
+        return "break"
+
+    def paste_chunk(self, data, pos):
+        end = pos + self.PASTE_CHUNK
+        self.text.insert("paste", data[pos:end])
+        if end < len(data):
+            self.meter.config(text=f"Pasting… {100 * end // len(data)}%", fg=self.accent)
+            self.paste_job = self.after(1, self.paste_chunk, data, end)
+        else:
+            self.paste_job = None
+            self.text.mark_set("insert", "paste")
+            self.text.mark_unset("paste")
+            self.text.see("insert")
+            self.request_count()
+
+    # --- background token counting -------------------------------------------
+
+    def request_count(self):
+        with self.count_lock:
+            self.count_request = (self.generation, self.get())
+        self.count_wakeup.set()
+
+    def count_loop(self):
+        while True:
+            self.count_wakeup.wait()
+            with self.count_lock:
+                self.count_wakeup.clear()
+                generation, text = self.count_request
+            self.ui.update("tokens", self.apply_count, generation, count_tokens(text))
+
+    def apply_count(self, generation, tokens):
+        if generation != self.generation or self.paste_job is not None:
+            return                                # edited since: a newer count is coming
+        self.tokens = tokens
+        self.counted = generation
+        self.show_meter()
+
+    def show_meter(self):
+        if not self.context_length:
+            self.meter.config(text=f"~{self.tokens:,} tokens", fg="#64748b")
+            return
+        used = self.tokens / self.context_length
+        color = "#ef4444" if used > 1 else "#f59e0b" if used > 0.8 else "#64748b"
+        self.meter.config(
+            text=f"~{self.tokens:,} / {self.context_length:,} tokens ({used:.0%})",
+            fg=color
+        )
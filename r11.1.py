@@ -1,11 +1,24 @@
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, filedialog
 import threading
 import time
 import random
 import sys
 import queue
 import webbrowser
+import itertools
+import os
+import bisect
+import heapq
+
+from catevents import KINDS, EventEmitter, dispatch_table
+from catexperts import ExpertWindow, RoutingLog
+from catindex import PrefixSums
+from catmarkdown import MarkdownRenderer, configure_tags
+from catpool import GenerationPool
+from catstore import ChatStore
+from cattokens import VOCAB, TokenBuffer
+from catui import Composer, Debouncer, StallWatchdog, TextMeasurer, count_tokens, thought_header
 
 # =============================================================================
 # CAT R1 - LOCAL DESKTOP SIMULATION
@@ -13,6 +26,10 @@ import webbrowser
 # Preserves original UI while adding realistic reasoning traces.
 # =============================================================================
 
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".catr1", "catseek.db")
+HISTORY_PAGE = 50                                  # messages paged in per load
+
+
 class CatInferenceEngine:
     """Simulates DeepSeek‑Nano distilled reasoning engine."""
     def __init__(self):
@@ -28,6 +45,8 @@ class CatInferenceEngine:
         self.num_attention_heads = 32                # For MLA
         self.vocab_size = 102400                     # Approximate
         self.context_length = 4096                    # Max tokens
+        # Fixed per-expert gate bias: some experts are simply more popular
+        self.router_bias = [random.gauss(0, 0.5) for _ in range(self.num_experts)]
 
     def boot_sequence(self, callback):
         steps = [
@@ -43,10 +62,20 @@ class CatInferenceEngine:
             time.sleep(random.uniform(0.1, 0.3))
         self.is_ready = True
 
-    def generate(self, query, message_queue):
-        # Simulate expert routing (top‑2)
-        experts = random.sample(range(1, self.num_experts + 1), self.active_experts)
-        message_queue.put(("debug", f"Routing through experts: {experts}"))
+    def route(self):
+        """Top‑k experts for one token: noisy gate scores around the router bias."""
+        scores = [(random.gauss(bias, 1.0), expert) for expert, bias in enumerate(self.router_bias, 1)]
+        return [expert for _, expert in heapq.nlargest(self.active_experts, scores)]
+
+    def generate(self, query, message_queue, request_id=None):
+        # Every event is tagged with the request it belongs to
+        emit = EventEmitter(request_id, message_queue.put).emit
+
+        # Simulate expert routing (top‑2): every prompt token, then every answer token
+        routing = RoutingLog(self.active_experts)
+        for _ in range(count_tokens(query)):      # counted, not interned: prompts are unbounded
+            routing.append(self.route())
+        emit("route", routing)
 
         if self.model_mode == "Cat-R1-Nano":
             # Chain‑of‑thought reasoning with architecture‑aware steps
@@ -73,7 +102,7 @@ class CatInferenceEngine:
             full_thought = ""
             for t in thoughts:
                 full_thought += f"● {t}\n"
-                message_queue.put(("thought", full_thought))
+                emit("thought", full_thought)
                 time.sleep(0.4)
 
         # Responses with cat persona
@@ -83,28 +112,39 @@ class CatInferenceEngine:
             "My distilled weights suggest this is optimal: here's your answer! owo",
             "Reasoning finished. Result: *curls tail* – anything else?"
         ]
-        answer = random.choice(responses)
-        current_text = ""
-        for char in answer:
-            current_text += char
-            message_queue.put(("answer", current_text))
-            time.sleep(0.01)
-        message_queue.put(("done", None))
+        # Token ids go into one shared buffer; no prefix string is built per
+        # token, the UI decodes whatever arrived when it next draws
+        answer = TokenBuffer()
+        for token in VOCAB.encode(random.choice(responses)):
+            routing.append(self.route())
+            emit("route", routing)
+            answer.append(token)
+            emit("answer", answer)
+            time.sleep(0.03)
+        emit("done", None)
 
 
 class CollapsibleThought(tk.Frame):
-    """DeepSeek‑style collapsible reasoning block."""
-    def __init__(self, parent, colors):
+    """DeepSeek‑style collapsible reasoning block.
+
+    While collapsed, update_text only refreshes the header counter and keeps
+    the newest content aside; the (expensive, re-wrapping) text label is
+    rendered once when the block is expanded again.
+    """
+    def __init__(self, parent, colors, on_toggle=None, collapsed=False):
         super().__init__(parent, bg=colors["bg"], pady=10)
         self.colors = colors
-        self.is_expanded = True
+        self.is_expanded = not collapsed
+        self.on_toggle = on_toggle
+        self.content = ""
+        self.dirty = False                        # content not yet shown in text_label
 
         self.header = tk.Frame(self, bg=colors["think_bg"])
         self.header.pack(fill="x")
         self.header.bind("<Button-1>", self.toggle)
 
         self.toggle_label = tk.Label(
-            self.header, text="▼ Thought Process",
+            self.header, text=thought_header("", self.is_expanded),
             font=("Arial", 9, "bold italic"),
             bg=colors["think_bg"], fg=colors["primary"],
             cursor="hand2", padx=10, pady=5
@@ -113,7 +153,8 @@ class CollapsibleThought(tk.Frame):
         self.toggle_label.bind("<Button-1>", self.toggle)
 
         self.content_frame = tk.Frame(self, bg=colors["think_bg"])
-        self.content_frame.pack(fill="x")
+        if self.is_expanded:
+            self.content_frame.pack(fill="x")
 
         mono_font = "Menlo" if sys.platform == "darwin" else "Consolas"
         self.text_label = tk.Label(
@@ -125,21 +166,979 @@ class CollapsibleThought(tk.Frame):
         self.text_label.pack(fill="x")
 
     def toggle(self, event=None):
-        self.is_expanded = not self.is_expanded
+        self.set_expanded(not self.is_expanded)
+        if self.on_toggle:
+            self.on_toggle(self.is_expanded)
+
+    def set_expanded(self, expanded):
+        self.is_expanded = expanded
         if self.is_expanded:
+            if self.dirty:
+                self.text_label.config(text=self.content)
+                self.dirty = False
             self.content_frame.pack(fill="x")
-            self.toggle_label.config(text="▼ Thought Process")
         else:
             self.content_frame.pack_forget()
-            self.toggle_label.config(text="▶ Show Thoughts")
+        self.toggle_label.config(text=thought_header(self.content, self.is_expanded))
+
+    def load(self, content, expanded):
+        """Show a different thought (row recycling): one render at most."""
+        self.content = content
+        self.dirty = True
+        self.set_expanded(expanded)
 
     def update_text(self, content):
-        self.text_label.config(text=content)
+        self.content = content
+        self.toggle_label.config(text=thought_header(content, self.is_expanded))
+        if self.is_expanded:
+            self.text_label.config(text=content)
+        else:
+            self.dirty = True
+
+
+class WakeQueue(queue.Queue):
+    """Engine -> UI queue that wakes the Tk loop instead of being polled.
+
+    Only the first put after the consumer went idle generates the virtual
+    event; later puts ride along until the consumer calls rearm() again, so a
+    fast engine cannot flood the Tk event queue.
+    """
+    def __init__(self, root, sequence="<<EngineEvent>>"):
+        super().__init__()
+        self.root = root
+        self.sequence = sequence
+        self.armed = True
+        self.wake_lock = threading.Lock()
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        with self.wake_lock:
+            wake, self.armed = self.armed, False
+        if wake:
+            try:
+                self.root.event_generate(self.sequence, when="tail")
+            except (tk.TclError, RuntimeError):
+                pass                              # window closed or mainloop gone
+
+    def rearm(self):
+        """Go idle; returns False if items slipped in and need draining first."""
+        with self.wake_lock:
+            if not self.empty():
+                return False
+            self.armed = True
+            return True
+
+
+class ChatMessage:
+    """Transcript model entry; widgets only exist while it is on screen."""
+    __slots__ = ("sender", "text", "is_bot", "debug", "thought", "thought_expanded", "seq",
+                 "streaming")
+
+    def __init__(self, sender, text="", is_bot=False, thought_expanded=True, seq=None):
+        self.sender = sender
+        self.text = text
+        self.is_bot = is_bot
+        self.debug = ""
+        self.thought = ""
+        self.thought_expanded = thought_expanded
+        self.seq = seq                            # position in the chat store
+        self.streaming = False                    # answer still growing
+
+
+class Conversation:
+    """One chat thread. Generation keeps writing into its messages whether
+    or not it is the conversation on screen."""
+    def __init__(self, conversation_id, title="New chat"):
+        self.id = conversation_id
+        self.title = title
+        self.messages = []
+        self.heights = PrefixSums()               # row heights for VirtualTranscript
+        self.in_flight = 0                        # generations still streaming
+        self.follow = True                        # view state restored on switch-back
+        self.view_top = 0.0
+        self.loaded = True                        # False until its history is paged in
+        self.first_seq = 0                        # store seq of messages[0]
+        self.later_seq = None                     # store seq after the last message in memory,
+                                                  # None when messages run to the newest
+        self.next_seq = 0                         # store seq of the next message
+
+
+class MessageRow(tk.Frame):
+    """Recyclable set of widgets that can display any ChatMessage."""
+    def __init__(self, parent, colors, on_resize):
+        super().__init__(parent, bg=colors["bg"], pady=10)
+        self.colors = colors
+        self.on_resize = on_resize
+        self.message = None
+        self.index = None
+        self.item = None                          # canvas window id
+        self.wrap_width = 550
+
+        self.sender_label = tk.Label(self, font=("Arial", 8, "bold"), bg=colors["bg"])
+        self.debug_label = tk.Label(
+            self, text="",
+            font=("Courier", 8),
+            bg=colors["bg"],
+            fg="#10b981"
+        )
+        self.thought_block = CollapsibleThought(self, colors, on_toggle=self.on_thought_toggle)
+        self.bubble = tk.Label(
+            self, text="",
+            fg="white", bg=colors["user_bubble"], font=("Arial", 11),
+            justify="left", wraplength=550,
+            padx=15, pady=10
+        )
+        # Bot answers are Markdown, streamed into a Text sized to its content
+        self.answer_frame = tk.Frame(self, bg=colors["bot_bubble"], width=580, height=40)
+        self.answer_frame.pack_propagate(False)
+        self.answer = tk.Text(
+            self.answer_frame, bg=colors["bot_bubble"], fg="white",
+            font=("Arial", 11), wrap="word",
+            relief="flat", highlightthickness=0, borderwidth=0,
+            padx=15, pady=10, cursor="arrow", state="disabled"
+        )
+        configure_tags(self.answer, colors, mono_font="Menlo" if sys.platform == "darwin" else "Consolas")
+        self.answer.pack(fill="both", expand=True)
+        self.answer.bind("<Configure>", lambda e: self.fit_answer())
+        self.markdown = None
+        self.bind("<Configure>", self.on_configure)
+
+    def bind_message(self, index, message):
+        self.index = index
+        self.message = message
+        self.markdown = None
+        for widget in (self.sender_label, self.debug_label, self.thought_block, self.bubble,
+                       self.answer_frame):
+            widget.pack_forget()
+
+        self.sender_label.config(
+            text=message.sender,
+            fg=self.colors["primary"] if message.is_bot else self.colors["text_s"]
+        )
+        self.sender_label.pack(anchor="w")
+        if message.is_bot:
+            self.debug_label.pack(anchor="w")
+        if message.thought:
+            self.thought_block.pack(fill="x", pady=5, after=self.debug_label)
+        self.thought_block.load(message.thought, message.thought_expanded)
+        for field in ("debug", "text"):
+            self.refresh(field)
+
+    def refresh(self, field):
+        message = self.message
+        if field == "debug":
+            self.debug_label.config(text=message.debug)
+        elif field == "thought":
+            if message.thought and not self.thought_block.winfo_manager():
+                self.thought_block.pack(fill="x", pady=5, after=self.debug_label)
+            self.thought_block.update_text(message.thought)
+        elif field == "text" and message.is_bot:
+            if message.text and not self.answer_frame.winfo_manager():
+                self.answer_frame.pack(anchor="w", pady=5)
+            self.render_answer()
+        elif field == "text":
+            if not self.bubble.winfo_manager():
+                self.bubble.pack(anchor="w", pady=5)
+            self.bubble.config(text=message.text)
+
+    def render_answer(self):
+        message = self.message
+        answer = self.answer
+        answer.configure(state="normal")
+        if self.markdown is None or not self.markdown.update(message.text):
+            # New binding or a replaced answer: parse it from the start
+            answer.delete("1.0", "end")
+            answer.mark_set("answer.end", "1.0")
+            answer.mark_gravity("answer.end", "right")
+            self.markdown = MarkdownRenderer(answer, "answer.end", "answer.tail")
+            self.markdown.update(message.text)
+        if not message.streaming:
+            self.markdown.finish()
+        answer.configure(state="disabled")
+        self.fit_answer()
+
+    def fit_answer(self):
+        """Size the answer's frame to the pixel height of its wrapped text."""
+        height = int(self.answer.tk.call(str(self.answer), "count", "-ypixels", "1.0", "end")) + 20
+        if height != self.answer_frame.winfo_reqheight():
+            self.answer_frame.config(height=height)
+
+    def set_wrap(self, width):
+        if width != self.wrap_width:
+            self.wrap_width = width
+            self.bubble.config(wraplength=width)
+            self.answer_frame.config(width=width + 30)   # wraplength + both paddings
+            self.thought_block.text_label.config(wraplength=width - 50)
+
+    def on_thought_toggle(self, expanded):
+        if self.message is not None:
+            self.message.thought_expanded = expanded
+
+    def on_configure(self, event):
+        if self.index is not None:
+            self.on_resize(self.index, event.height)
+
+
+class VirtualTranscript(tk.Frame):
+    """Chat transcript that only materialises rows near the viewport.
+
+    Messages live in `messages`; their heights (measured once shown, estimated
+    before that) live in a PrefixSums tree so offsets and hit-tests stay
+    O(log n). Rows scrolled out of view go back to a spare pool and are
+    rebound to whichever message scrolls in next. Both belong to the loaded
+    Conversation, so switching conversations only rebinds the visible rows.
+    """
+    MARGIN = 400                                  # px kept alive above/below the viewport
+
+    def __init__(self, parent, colors):
+        super().__init__(parent, bg=colors["bg"])
+        self.colors = colors
+        self.conversation = None
+        self.messages = []
+        self.heights = PrefixSums()
+        self.rows = {}                            # message index -> MessageRow
+        self.spare_rows = []
+        self.follow = True                        # keep the newest message in view
+        self.on_reach_top = None                  # called when scrolled to the very top
+        self.on_reach_bottom = None               # called when scrolled to the very bottom
+        self.refresh_pending = False
+        self.wrap_width = 550
+        self.measurer = TextMeasurer(("Arial", 11))
+        self.reflow_later = Debouncer(self, 120, self.reflow)
+
+        self.canvas = tk.Canvas(self, bg=colors["bg"], highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True, padx=40, pady=20)
+
+        self.canvas.bind("<Configure>", self.on_canvas_configure)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.bind_all(sequence, self.on_wheel, add="+")
+
+    def load(self, conversation, top_index=None):
+        """Show another conversation; costs O(visible rows), not O(history).
+
+        top_index scrolls that message to the top instead of restoring the
+        conversation's previous position (used after paging in history).
+        """
+        if self.conversation is not None:
+            self.conversation.follow = self.follow
+            self.conversation.view_top = self.canvas.yview()[0]
+        for index in list(self.rows):
+            self.release_row(index)
+        self.conversation = conversation
+        self.messages = conversation.messages
+        self.heights = conversation.heights
+        for message in self.messages[len(self.heights):]:
+            self.heights.append(self.estimate_height(message))   # paged in from the store
+        total = max(self.heights.total(), 1)
+        if top_index is not None:
+            conversation.follow = False
+            conversation.view_top = self.heights.prefix(top_index) / total
+        self.follow = conversation.follow
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), total))
+        self.canvas.yview_moveto(conversation.view_top)
+        self.refresh()
+
+    def show_earlier(self, count):
+        return 0                                  # every loaded message is reachable already
+
+    def prepended(self, conversation, count):
+        """`count` older messages were put in front of conversation.messages."""
+        if conversation is self.conversation:
+            self.load(conversation, top_index=count)
+
+    def appended(self, conversation, count):
+        """`count` newer stored messages were added to conversation.messages."""
+        if conversation is self.conversation:
+            for message in self.messages[len(self.heights):]:
+                self.heights.append(self.estimate_height(message))
+            self.schedule_refresh()
+
+    def append(self, message):
+        self.messages.append(message)
+        self.heights.append(self.estimate_height(message))
+        self.schedule_refresh()
+        return len(self.messages) - 1
+
+    def update_message(self, index, field):
+        row = self.rows.get(index)
+        if row is not None:
+            row.refresh(field)
+        # The row's <Configure> event corrects its height if the text reflowed
+
+    def scroll_to_end(self, force=True):
+        if force:
+            self.follow = True
+        self.schedule_refresh()
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        top, bottom = self.canvas.yview()
+        self.follow = bottom >= 0.999
+        self.schedule_refresh()
+        if top <= 0 and self.on_reach_top:
+            self.on_reach_top()
+        elif bottom >= 1.0 and self.on_reach_bottom:
+            self.on_reach_bottom()
+
+    def on_wheel(self, event):
+        if not str(event.widget).startswith(str(self)):
+            return
+        if event.num == 4:
+            step = -1
+        elif event.num == 5:
+            step = 1
+        else:
+            step = -1 if event.delta > 0 else 1
+        self.yview("scroll", step * 3, "units")
+
+    def estimate_height(self, message):
+        lines = self.measurer.count_lines(str(message.text), self.wrap_width)
+        if message.thought and message.thought_expanded:
+            lines += message.thought.count("\n") + len(message.thought) // 60 + 2
+        return 50 + 18 * lines
+
+    def on_canvas_configure(self, event):
+        self.schedule_refresh()
+        self.reflow_later(event.width)
+
+    def reflow(self, width):
+        """Re-wrap for a new canvas width, once the resize drag has settled."""
+        wrap_width = max(200, int(width * 0.75))
+        if wrap_width == self.wrap_width:
+            return
+        # Off-screen rows: scale their text height instead of measuring them;
+        # they get measured for real when they scroll into view.
+        ratio = self.wrap_width / wrap_width
+        self.wrap_width = wrap_width
+        self.heights.rebuild(
+            h if index in self.rows else 50 + int((h - 50) * ratio)
+            for index, h in enumerate(self.heights.values)
+        )
+        for row in self.rows.values():
+            row.set_wrap(wrap_width)
+        self.schedule_refresh()
+
+    def schedule_refresh(self):
+        if not self.refresh_pending:
+            self.refresh_pending = True
+            self.after_idle(self.refresh)
+
+    def refresh(self):
+        self.refresh_pending = False
+        width = self.canvas.winfo_width()
+        self.canvas.configure(scrollregion=(0, 0, width, max(self.heights.total(), 1)))
+        if self.follow:
+            self.canvas.yview_moveto(1.0)
+
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        if self.messages:
+            first = self.heights.find(max(0, top - self.MARGIN))
+            last = self.heights.find(bottom + self.MARGIN)
+        else:
+            first, last = 0, -1
+
+        for index in [i for i in self.rows if i < first or i > last]:
+            self.release_row(index)
+        for index in range(first, last + 1):
+            row = self.rows.get(index) or self.acquire_row(index)
+            self.canvas.coords(row.item, 0, self.heights.prefix(index))
+            self.canvas.itemconfigure(row.item, width=width, state="normal")
+
+    def acquire_row(self, index):
+        if self.spare_rows:
+            row = self.spare_rows.pop()
+        else:
+            row = MessageRow(self.canvas, self.colors, on_resize=self.on_row_resize)
+            row.item = self.canvas.create_window(0, 0, window=row, anchor="nw")
+        row.set_wrap(self.wrap_width)
+        row.bind_message(index, self.messages[index])
+        self.rows[index] = row
+        return row
+
+    def release_row(self, index):
+        row = self.rows.pop(index)
+        row.index = None
+        row.message = None
+        self.canvas.itemconfigure(row.item, state="hidden")
+        self.spare_rows.append(row)
+
+    def on_row_resize(self, index, height):
+        if self.heights.values[index] != height:
+            self.heights.set(index, height)
+            self.schedule_refresh()
+
+
+class TextTranscript(tk.Frame):
+    """Alternative transcript renderer: one tk.Text, append-only inserts.
+
+    Every message owns a pair of marks per region (debug, thought, text).
+    Streamed answers and thoughts arrive as full prefixes, so only the
+    characters past what is already rendered get inserted at the region's
+    end mark; Tk never re-wraps text that has not changed.
+
+    Loading a conversation renders only its last LOAD_TAIL messages; older
+    ones are inserted at the top a page at a time as the user scrolls up.
+    Marks are named by index - origin, and origin grows by the number of
+    messages paged in from the store, so existing marks never need renaming.
+    """
+    LOAD_TAIL = 200
+
+    def __init__(self, parent, colors):
+        super().__init__(parent, bg=colors["bg"])
+        self.colors = colors
+        self.conversation = None
+        self.messages = []
+        self.rendered = {}                        # message index -> {field: chars already inserted}
+        self.first = 0                            # first rendered message index
+        self.origin = 0                           # messages prepended since load
+        self.follow = True
+        self.on_reach_top = None
+        self.on_reach_bottom = None
+        self.scroll_pending = False
+
+        mono_font = "Menlo" if sys.platform == "darwin" else "Consolas"
+        self.text = tk.Text(
+            self, bg=colors["bg"], fg="white",
+            font=("Arial", 11), wrap="word",
+            relief="flat", highlightthickness=0,
+            padx=40, pady=20, cursor="arrow",
+            state="disabled"
+        )
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.text.configure(yscrollcommand=self.scrollbar.set)
+
+        self.scrollbar.pack(side="right", fill="y")
+        self.text.pack(side="left", fill="both", expand=True)
+
+        self.text.tag_configure("sender", font=("Arial", 8, "bold"), foreground=colors["text_s"], spacing1=10)
+        self.text.tag_configure("sender_bot", font=("Arial", 8, "bold"), foreground=colors["primary"], spacing1=10)
+        self.text.tag_configure("debug", font=("Courier", 8), foreground="#10b981")
+        self.text.tag_configure(
+            "thought_header", font=("Arial", 9, "bold italic"),
+            foreground=colors["primary"], background=colors["think_bg"]
+        )
+        self.text.tag_configure(
+            "thought", font=(mono_font, 9), foreground=colors["think_text"],
+            background=colors["think_bg"], lmargin1=15, lmargin2=15
+        )
+        self.text.tag_configure("user", background=colors["user_bubble"], spacing1=5, spacing3=5)
+        self.text.tag_configure("bot", background=colors["bot_bubble"], spacing1=5, spacing3=5)
+        self.text.tag_configure("collapsed", elide=True)
+        configure_tags(self.text, colors, mono_font=mono_font)
+        self.text.tag_bind("thought_header", "<Button-1>", self.on_thought_click)
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.text.bind(sequence, lambda e: self.after_idle(self.check_follow), add="+")
+
+    def name(self, index):
+        """Mark prefix of a message; stable while pages are prepended."""
+        key = index - self.origin
+        return f"m{key}" if key >= 0 else f"mn{-key}"
+
+    def index_of(self, mark):
+        key = mark[1:].split(".", 1)[0]
+        return (-int(key[1:]) if key.startswith("n") else int(key)) + self.origin
+
+    def load(self, conversation, top_index=None):
+        if self.conversation is not None:
+            self.conversation.follow = self.follow
+        self.conversation = conversation
+        self.messages = conversation.messages
+        self.rendered = {}
+        self.origin = 0
+        self.follow = conversation.follow
+        text = self.text
+        text.configure(state="normal")
+        text.delete("1.0", "end")
+        text.mark_unset(*[m for m in text.mark_names() if m.startswith("m") and "." in m])
+        text.mark_set("earlier.end", "1.0")
+        self.first = max(0, len(self.messages) - self.LOAD_TAIL)
+        if top_index is not None:
+            self.first = min(self.first, top_index)   # a search hit further back
+        self.set_notice()
+        text.configure(state="disabled")
+        for index in range(self.first, len(self.messages)):
+            self.render_message(index)
+        if top_index is not None and top_index in self.rendered:
+            self.show_at_top(top_index)
+        else:
+            self.scroll_to_end(force=False)
+
+    def set_notice(self):
+        """The line above the first rendered message counting hidden ones."""
+        text = self.text
+        text.delete("1.0", "earlier.end")
+        if self.first:
+            text.mark_gravity("earlier.end", "right")
+            text.insert("1.0", f"… {self.first} earlier messages not shown\n\n", "sender")
+        text.mark_gravity("earlier.end", "left")  # older messages go in after it
+
+    def show_at_top(self, index):
+        self.follow = False
+        self.text.yview(f"{self.name(index)}.sender")
+
+    def show_earlier(self, count):
+        """Render up to `count` hidden messages above the first rendered one.
+
+        Only the new messages are inserted; returns how many there were.
+        """
+        start = max(0, self.first - count)
+        shown = self.first - start
+        if not shown:
+            return 0
+        text = self.text
+        text.mark_set("earlier.top", "earlier.end")
+        text.mark_gravity("earlier.top", "right")   # advances past each inserted message
+        for index in range(start, self.first):
+            self.render_message(index, at="earlier.top")
+        old_first, self.first = self.first, start
+        text.configure(state="normal")
+        self.set_notice()
+        text.configure(state="disabled")
+        self.show_at_top(old_first)
+        return shown
+
+    def prepended(self, conversation, count):
+        """`count` older messages were put in front of conversation.messages."""
+        if conversation is not self.conversation:
+            return
+        self.origin += count
+        self.first += count
+        self.rendered = {index + count: state for index, state in self.rendered.items()}
+        self.show_earlier(count)
+
+    def appended(self, conversation, count):
+        """`count` newer stored messages were added to conversation.messages."""
+        if conversation is self.conversation:
+            for index in range(len(self.messages) - count, len(self.messages)):
+                self.render_message(index)
+
+    def append(self, message):
+        self.messages.append(message)
+        index = len(self.messages) - 1
+        self.render_message(index)
+        return index
+
+    def render_message(self, index, at="end-1c"):
+        message = self.messages[index]
+        self.rendered[index] = {"thought": 0, "text": 0, "thought_header": False}
+        name = self.name(index)
+        text = self.text
+        text.configure(state="normal")
+        pos = text.index(at)
+        text.insert(at, message.sender + "\n", "sender_bot" if message.is_bot else "sender")
+        text.mark_set(name + ".sender", pos)
+        text.mark_gravity(name + ".sender", "right")   # stays with this message when older ones go in above
+        if message.is_bot:
+            self.add_region(name + ".debug", "\n", at=at)
+            self.add_region(name + ".thought", "\n", "collapsed", at=at)
+        self.add_region(name + ".text", "\n\n", at=at)
+        text.configure(state="disabled")
+
+        for field in ("debug", "thought", "text"):
+            if getattr(message, field):
+                self.update_message(index, field)
+
+    def add_region(self, name, separator, separator_tags=(), at="end-1c"):
+        pos = self.text.index(at)
+        self.text.insert(at, separator, separator_tags)
+        for suffix, gravity in ((".start", "left"), (".end", "right")):
+            self.text.mark_set(name + suffix, pos)
+            self.text.mark_gravity(name + suffix, gravity)
+
+    def update_message(self, index, field):
+        if index not in self.rendered:
+            return
+        message = self.messages[index]
+        content = getattr(message, field)
+        name = self.name(index)
+        start, end = f"{name}.{field}.start", f"{name}.{field}.end"
+        text = self.text
+        text.configure(state="normal")
+        if field == "debug":
+            text.delete(start, end)
+            text.insert(end, content, "debug")
+        else:
+            rendered = self.rendered[index]
+            if field == "thought":
+                if not content:
+                    text.configure(state="disabled")
+                    return
+                start = f"{name}.thought.body"
+                if not rendered["thought_header"]:
+                    # First thought: reveal the separator and add a clickable header
+                    text.tag_remove("collapsed", end, f"{end} +1c")
+                    text.insert(end, "\n", "thought_header")
+                    text.mark_set(start, end)
+                    text.mark_gravity(start, "left")
+                    rendered["thought_header"] = True
+                self.set_thought_header(index)
+                if not message.thought_expanded:
+                    # Hidden: the counter is all that changes until it is expanded
+                    text.configure(state="disabled")
+                    return
+                tags = ("thought",)
+            elif message.is_bot:
+                self.render_answer(index, content)
+                text.configure(state="disabled")
+                return
+            else:
+                tags = ("user",)
+
+            done = rendered[field]
+            if len(content) >= done:
+                text.insert(end, content[done:], tags)
+            else:
+                text.delete(start, end)
+                text.insert(end, content, tags)
+            rendered[field] = len(content)
+        text.configure(state="disabled")
+
+    def render_answer(self, index, content):
+        """Bot answers stream through a per-message Markdown renderer."""
+        rendered = self.rendered[index]
+        markdown = rendered.get("markdown")
+        if markdown is None or not markdown.update(content):
+            name = self.name(index)
+            end = f"{name}.text.end"
+            self.text.delete(f"{name}.text.start", end)
+            markdown = rendered["markdown"] = MarkdownRenderer(
+                self.text, end, f"{name}.text.tail", tags=("bot",)
+            )
+            markdown.update(content)
+        if not self.messages[index].streaming:
+            markdown.finish()
+
+    def set_thought_header(self, index):
+        message = self.messages[index]
+        header_end = f"{self.name(index)}.thought.body -1c"
+        self.text.delete(f"{header_end} linestart", header_end)
+        self.text.insert(
+            f"{header_end} linestart",
+            thought_header(message.thought, message.thought_expanded),
+            "thought_header"
+        )
+
+    def on_thought_click(self, event):
+        mark = self.text.mark_next(self.text.index(f"@{event.x},{event.y}"))
+        while mark and not mark.endswith(".thought.body"):
+            mark = self.text.mark_next(mark)
+        if not mark:
+            return
+        index = self.index_of(mark)
+        message = self.messages[index]
+        message.thought_expanded = not message.thought_expanded
+        body, end = mark, f"{self.name(index)}.thought.end"
+        self.text.configure(state="normal")
+        if message.thought_expanded:
+            self.text.tag_remove("collapsed", body, end)
+            self.text.configure(state="disabled")
+            self.update_message(index, "thought")  # renders what arrived while hidden
+            return
+        self.text.tag_add("collapsed", body, end)
+        self.set_thought_header(index)
+        self.text.configure(state="disabled")
+
+    def scroll_to_end(self, force=True):
+        if force:
+            self.follow = True
+        if self.follow and not self.scroll_pending:
+            self.scroll_pending = True
+            self.after_idle(self.do_scroll)
+
+    def do_scroll(self):
+        self.scroll_pending = False
+        if self.follow:
+            self.text.see("end")
+
+    def yview(self, *args):
+        self.text.yview(*args)
+        self.check_follow()
+
+    def check_follow(self):
+        top, bottom = self.text.yview()
+        self.follow = bottom >= 0.999
+        if top <= 0 and self.on_reach_top:
+            self.on_reach_top()
+        elif bottom >= 1.0 and self.on_reach_bottom:
+            self.on_reach_bottom()
+
+
+class StreamContext:
+    """Routes one in-flight generation's events into its conversation.
+
+    The model is always updated; widgets only when the conversation is the
+    one currently loaded in the transcript.
+    """
+    def __init__(self, request_id, conversation, index, transcript, seq, router=None):
+        self.request_id = request_id
+        self.conversation = conversation
+        self.index = index
+        self.message = conversation.messages[index]
+        self.transcript = transcript
+        self.seq = seq                            # store seq reserved for this reply
+        self.done = False
+        self.started = time.time()
+        self.first_token = None
+        self.finished = None
+        self.router = router                      # takes routing decisions, e.g. the heatmap
+        self.routed = 0                           # tokens of the routing log already passed on
+        self.handlers = dispatch_table(self)       # event kind -> on_<kind>
+
+    def render(self, field):
+        if self.transcript.conversation is self.conversation:
+            self.transcript.update_message(self.index, field)
+
+    def on_debug(self, content):
+        self.message.debug = content
+        self.render("debug")
+
+    def on_route(self, content):
+        if self.router is not None:
+            self.routed = self.router.feed(content, self.routed)
+        self.message.debug = f"Routing through experts: {content.last()}"
+        self.render("debug")
+
+    def on_thought(self, content):
+        self.message.thought = content
+        self.render("thought")
+
+    def on_answer(self, content):
+        if self.first_token is None:
+            self.first_token = time.time()
+        if isinstance(content, TokenBuffer):
+            content = content.view()              # a Rope: renderers slice out only the new text
+        self.message.text = content
+        self.render("text")
+
+    def on_done(self, content):
+        self.done = True
+        self.finished = time.time()
+        self.message.text = str(self.message.text)
+        self.message.streaming = False
+        self.render("text")                       # styles the answer's last line
+
+
+def rss_mb():
+    """Resident memory of this process in MiB (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class PerfHUD:
+    """Overlay that tells engine slowness from UI slowness at a glance.
+
+    process_queue reports each drain through record_drain(); that is a few
+    additions, so the counters run all the time. The overlay itself only
+    exists while shown and redraws every INTERVAL ms; how late that redraw
+    fires is the Tk loop's lag.
+    """
+    INTERVAL = 250                                # ms between redraws
+
+    def __init__(self, app):
+        self.app = app
+        self.label = tk.Label(
+            app.main_container, text="", justify="left", anchor="nw",
+            font=("Menlo" if sys.platform == "darwin" else "Consolas", 9),
+            bg="#000000", fg="#10b981", padx=8, pady=6
+        )
+        self.job = None
+        self.last_tick = 0.0
+        self.ttft = None                          # seconds, last finished request
+        self.reset()
+
+    def reset(self):
+        self.drains = 0
+        self.events = 0
+        self.tokens = 0
+        self.max_work = 0.0
+        self.max_wait = 0.0
+
+    def record_drain(self, events, tokens, seconds, wait=0.0):
+        """`wait`: how long the oldest drained event sat in the queue."""
+        self.drains += 1
+        self.events += events
+        self.tokens += tokens
+        if seconds > self.max_work:
+            self.max_work = seconds
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+    @property
+    def visible(self):
+        return self.job is not None
+
+    def toggle(self, event=None):
+        if self.visible:
+            self.app.root.after_cancel(self.job)
+            self.job = None
+            self.label.place_forget()
+            return
+        self.label.place(relx=1.0, x=-12, y=12, anchor="ne")
+        self.label.lift()
+        self.reset()
+        self.last_tick = time.perf_counter()
+        self.job = self.app.root.after(self.INTERVAL, self.tick)
+
+    def tick(self):
+        now = time.perf_counter()
+        elapsed = now - self.last_tick
+        lag = max(0.0, elapsed * 1000 - self.INTERVAL)
+        self.last_tick = now
+        app = self.app
+        backlog = sum(len(events) for events in app.pending_events.values())
+        rss = rss_mb()
+        stalls = app.watchdog.metrics()
+        lines = [
+            f"frame   {self.max_work * 1000:5.1f} ms work  {lag:5.0f} ms late",
+            f"queue   {app.msg_queue.qsize():5d} raw  {backlog:5d} pending  {self.max_wait * 1000:5.1f} ms wait",
+            f"drain   {self.events / self.drains if self.drains else 0:5.1f} ev/tick  {self.drains / elapsed:4.0f} ticks/s",
+            f"gen     {self.tokens / elapsed:5.1f} tok/s  {len(app.streams)} streaming",
+            f"ttft    {self.ttft * 1000:5.0f} ms" if self.ttft is not None else "ttft        - ",
+            f"rss     {rss:5.0f} MiB" if rss is not None else "rss         - ",
+            f"stalls  {stalls['stalls']:5d}  max {stalls['stall_max_ms']:6.0f} ms",
+        ]
+        self.label.config(text="\n".join(lines))
+        self.reset()
+        self.job = app.root.after(self.INTERVAL, self.tick)
+
+
+class ExpertHeatmap(tk.Frame):
+    """Sidebar heatmap of expert selections over a sliding window of tokens.
+
+    feed() only folds new router decisions into the counts. The canvas is
+    redrawn at most every INTERVAL ms, and then only cells whose shade
+    changed are reconfigured.
+    """
+    INTERVAL = 200                                # ms between redraws
+    COLUMNS = 8
+    CELL = 25                                     # px
+    SHADES = 16
+
+    def __init__(self, parent, num_experts, colors, window=2048):
+        super().__init__(parent, bg=colors["sidebar"])
+        self.window = ExpertWindow(num_experts, window)
+        self.colors = colors
+        self.job = None
+        self.drawn = None                         # window.version last drawn
+        self.shades = [None] * num_experts
+
+        header = tk.Frame(self, bg=colors["sidebar"])
+        header.pack(fill="x")
+        tk.Label(
+            header, text="EXPERTS",
+            font=("Arial", 8, "bold"),
+            bg=colors["sidebar"], fg=colors["text_s"]
+        ).pack(side="left")
+        tk.Button(
+            header, text="Export",
+            bg="#000000", fg=colors["primary"],
+            font=("Arial", 8, "bold"),
+            relief="flat", padx=6,
+            activebackground="#000000",
+            activeforeground=colors["primary"],
+            command=self.export
+        ).pack(side="right")
+
+        rows = -(-num_experts // self.COLUMNS)
+        self.canvas = tk.Canvas(
+            self, width=self.COLUMNS * self.CELL, height=rows * self.CELL,
+            bg=colors["sidebar"], highlightthickness=0
+        )
+        self.canvas.pack(pady=(5, 0))
+        self.palette = [
+            self.blend(colors["border"], colors["primary"], level / (self.SHADES - 1))
+            for level in range(self.SHADES)
+        ]
+        for expert in range(num_experts):
+            row, column = divmod(expert, self.COLUMNS)
+            x, y = column * self.CELL, row * self.CELL
+            self.canvas.create_rectangle(
+                x + 1, y + 1, x + self.CELL - 1, y + self.CELL - 1,
+                fill=self.palette[0], outline="", tags=(f"cell{expert}",)
+            )
+            self.canvas.create_text(
+                x + self.CELL / 2, y + self.CELL / 2, text=str(expert + 1),
+                fill=colors["text_p"], font=("Arial", 7)
+            )
+
+        self.summary = tk.Label(
+            self, text="no tokens routed yet",
+            font=("Arial", 8),
+            bg=colors["sidebar"], fg=colors["text_s"]
+        )
+        self.summary.pack(anchor="w")
+
+    @staticmethod
+    def blend(low, high, t):
+        a = [int(low[i:i + 2], 16) for i in (1, 3, 5)]
+        b = [int(high[i:i + 2], 16) for i in (1, 3, 5)]
+        return "#" + "".join(f"{round(x + (y - x) * t):02x}" for x, y in zip(a, b))
+
+    def feed(self, log, start):
+        """Count log's decisions from token `start` on; returns the next start."""
+        start = self.window.feed(log, start)
+        if self.job is None:
+            self.job = self.after(self.INTERVAL, self.redraw)
+        return start
+
+    def redraw(self):
+        self.job = None
+        window = self.window
+        if window.version == self.drawn:
+            return
+        self.drawn = window.version
+        peak = max(window.counts) or 1
+        for expert, count in enumerate(window.counts):
+            shade = count * (self.SHADES - 1) // peak
+            if shade != self.shades[expert]:
+                self.shades[expert] = shade
+                self.canvas.itemconfigure(f"cell{expert}", fill=self.palette[shade])
+        self.summary.config(
+            text=f"last {len(window.recent)} tokens · hottest {window.imbalance():.2f}× mean"
+        )
+
+    def export(self):
+        path = filedialog.asksaveasfilename(
+            parent=self, title="Export expert histogram",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            self.window.export(path)
+        except OSError as exc:
+            self.summary.config(text=f"export failed: {exc.strerror}")
+
+
+TRANSCRIPT_RENDERERS = {
+    "virtual": VirtualTranscript,                 # recycled widget rows on a canvas
+    "text": TextTranscript,                       # single tagged tk.Text
+}
 
 
 class CatSeekApp:
-    def __init__(self, root):
+    def __init__(self, root, renderer="virtual", frame_budget_ms=8, collapse_thoughts=False,
+                 store_path=DEFAULT_STORE_PATH, show_hud=False):
         self.root = root
+        self.renderer = renderer
+        self.collapse_thoughts = collapse_thoughts
+        self.frame_budget = frame_budget_ms / 1000.0
         self.root.title("Cat R1 - Local Intelligence (DeepSeek‑Nano Distill)")
         self.root.geometry("1100x750")
 
@@ -158,13 +1157,29 @@ class CatSeekApp:
 
         self.root.configure(bg=self.colors["bg"])
         self.engine = CatInferenceEngine()
-        self.msg_queue = queue.Queue()
+        self.msg_queue = WakeQueue(self.root)
+        self.drain_job = None
         self.deep_mode = False
+        self.pool = GenerationPool(workers=2)
+        self.streams = {}                         # request_id -> StreamContext
+        self.pending_events = {}                  # request_id -> {mode: latest content}
+        self.request_ids = itertools.count(1)
+        self.store = ChatStore(store_path) if store_path else None
+        self.conversation_ids = itertools.count(self.store.next_conversation_id() if self.store else 1)
+        self.conversations = []                   # newest first, same order as chat_list
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.watchdog = StallWatchdog(self.root, context=self.stall_context)
+        self.watchdog.watch_input(self.root)
 
         self.setup_styles()
         self.setup_ui()
 
-        self.root.after(100, self.process_queue)
+        self.root.bind(self.msg_queue.sequence, lambda e: self.schedule_drain())
+        self.hud = PerfHUD(self)
+        self.root.bind("<F12>", self.hud.toggle)
+        if show_hud:
+            self.hud.toggle()
         threading.Thread(
             target=self.engine.boot_sequence,
             args=(self.update_status,),
@@ -245,6 +1260,65 @@ class CatSeekApp:
         )
         self.chat_btn.pack(anchor="w", padx=30, pady=5, fill="x")
 
+        tk.Label(
+            self.sidebar, text="CHATS",
+            font=("Arial", 8, "bold"),
+            bg=self.colors["sidebar"], fg=self.colors["text_s"]
+        ).pack(anchor="w", padx=20, pady=(30, 5))
+
+        self.new_chat_btn = tk.Button(
+            self.sidebar, text="+ New Chat",
+            bg="#000000",
+            fg=self.colors["primary"],
+            font=("Arial", 10, "bold"),
+            relief="flat",
+            activebackground="#000000",
+            activeforeground=self.colors["primary"],
+            command=self.new_conversation
+        )
+        self.new_chat_btn.pack(anchor="w", padx=30, pady=5, fill="x")
+
+        self.chat_list = tk.Listbox(
+            self.sidebar,
+            bg=self.colors["sidebar"], fg="white",
+            selectbackground=self.colors["border"],
+            selectforeground=self.colors["primary"],
+            font=("Arial", 10),
+            activestyle="none", relief="flat",
+            borderwidth=0, highlightthickness=0,
+            height=8
+        )
+        self.chat_list.pack(anchor="w", padx=30, pady=5, fill="x")
+        self.chat_list.bind("<<ListboxSelect>>", self.on_chat_select)
+
+        # Search across all stored conversations
+        self.search_entry = tk.Entry(
+            self.sidebar,
+            bg=self.colors["bg"], fg="white",
+            insertbackground="white",
+            font=("Arial", 10),
+            relief="flat",
+            highlightthickness=1,
+            highlightbackground=self.colors["border"],
+            highlightcolor=self.colors["primary"]
+        )
+        self.search_entry.pack(anchor="w", padx=30, pady=(10, 5), fill="x")
+        self.search_later = Debouncer(self.root, 150, self.run_search)
+        self.search_entry.bind("<KeyRelease>", lambda e: self.search_later())
+
+        self.search_results = tk.Listbox(
+            self.sidebar,
+            bg=self.colors["sidebar"], fg=self.colors["think_text"],
+            selectbackground=self.colors["border"],
+            selectforeground=self.colors["primary"],
+            font=("Arial", 9),
+            activestyle="none", relief="flat",
+            borderwidth=0, highlightthickness=0,
+            height=6
+        )
+        self.search_results.bind("<<ListboxSelect>>", self.on_search_select)
+        self.search_hits = []
+
         self.status_label = tk.Label(
             self.sidebar, text="Initializing...",
             font=("Arial", 8),
@@ -254,48 +1328,40 @@ class CatSeekApp:
         )
         self.status_label.pack(side="bottom", pady=20)
 
+        # Router decisions of every request, for spotting expert hot-spots
+        self.heatmap = ExpertHeatmap(self.sidebar, self.engine.num_experts, self.colors)
+        self.heatmap.pack(side="bottom", padx=30, fill="x")
+
         # --- Main Chat ---
         self.main_container = tk.Frame(self.root, bg=self.colors["bg"])
         self.main_container.pack(side="right", fill="both", expand=True)
 
-        self.canvas = tk.Canvas(self.main_container, bg=self.colors["bg"], highlightthickness=0)
-        self.scroll_frame = tk.Frame(self.canvas, bg=self.colors["bg"])
-        self.scrollbar = ttk.Scrollbar(self.main_container, orient="vertical", command=self.canvas.yview)
-
-        self.canvas.create_window((0, 0), window=self.scroll_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-
-        self.scrollbar.pack(side="right", fill="y")
-        self.canvas.pack(side="top", fill="both", expand=True, padx=40, pady=20)
-
-        self.scroll_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
+        self.transcript = TRANSCRIPT_RENDERERS[self.renderer](self.main_container, self.colors)
+        self.transcript.pack(side="top", fill="both", expand=True)
+        self.transcript.on_reach_top = self.load_earlier
+        self.transcript.on_reach_bottom = self.load_later
+        self.list_stored_conversations()
+        self.new_conversation()
 
         # Input Area
         input_frame = tk.Frame(self.main_container, bg=self.colors["bg"])
         input_frame.pack(side="bottom", fill="x", padx=40, pady=20)
 
-        self.entry = tk.Entry(
-            input_frame,
+        self.composer = Composer(
+            input_frame, on_submit=self.send_message,
+            context_length=self.engine.context_length,
             bg=self.colors["sidebar"], fg="white",
-            insertbackground="white",
-            font=("Arial", 12),
-            relief="flat",
-            highlightthickness=1,
-            highlightbackground=self.colors["border"],
-            highlightcolor=self.colors["primary"]
+            accent=self.colors["primary"], border=self.colors["border"],
+            watchdog=self.watchdog
         )
-        self.entry.pack(side="left", fill="x", expand=True, ipady=10, padx=(0, 15))
-        self.entry.bind("<Return>", lambda e: self.send_message())
+        self.composer.pack(side="left", fill="x", expand=True, padx=(0, 15))
 
         self.send_btn = tk.Button(
             input_frame, text="Send",
             bg="#000000", fg=self.colors["primary"],
             font=("Arial", 10, "bold"),
             relief="flat", padx=25,
-            command=self.send_message,
+            command=self.composer.submit,
             activebackground="#000000",
             activeforeground=self.colors["primary"]
         )
@@ -328,95 +1394,302 @@ class CatSeekApp:
         self.engine.model_mode = self.model_var.get()
         self.update_status(f"Switched to {self.engine.model_mode}")
 
+    def new_conversation(self):
+        conversation = Conversation(next(self.conversation_ids))
+        self.conversations.insert(0, conversation)
+        self.chat_list.insert(0, conversation.title)
+        self.switch_conversation(conversation)
+
+    def list_stored_conversations(self):
+        """Sidebar entries for stored chats; their messages load on first open."""
+        if not self.store:
+            return
+        for conversation_id, title, next_seq in self.store.list_conversations():
+            conversation = Conversation(conversation_id, title)
+            conversation.loaded = False
+            conversation.first_seq = conversation.next_seq = next_seq
+            self.conversations.append(conversation)
+            self.chat_list.insert(tk.END, title)
+
+    def stored_messages(self, rows):
+        messages = []
+        for seq, sender, is_bot, text, thought, debug in rows:
+            message = ChatMessage(sender, text, bool(is_bot), thought_expanded=not self.collapse_thoughts, seq=seq)
+            message.thought = thought
+            message.debug = debug
+            messages.append(message)
+        return messages
+
+    def page_in(self, conversation):
+        """Prepend up to HISTORY_PAGE older stored messages; returns how many."""
+        rows = self.store.load_messages(conversation.id, HISTORY_PAGE, before_seq=conversation.first_seq)
+        conversation.loaded = True
+        if not rows:
+            conversation.first_seq = 0
+            return 0
+        older = self.stored_messages(rows)
+        conversation.messages[:0] = older
+        conversation.heights = PrefixSums()       # re-estimated by the transcript on load
+        conversation.first_seq = rows[0][0]
+        for stream in self.streams.values():
+            if stream.conversation is conversation:
+                stream.index += len(older)
+        return len(older)
+
+    def load_earlier(self):
+        self.watchdog.poke()                      # may hit the store and lay out a page
+        if self.transcript.show_earlier(HISTORY_PAGE):
+            return                                # older messages were in memory, just not shown
+        conversation = self.active
+        if not self.store or conversation.first_seq <= 0:
+            return
+        added = self.page_in(conversation)
+        if added:
+            self.transcript.prepended(conversation, added)
+
+    def page_around(self, conversation, seq):
+        """Swap the conversation's messages for one page around `seq`.
+
+        One query, however far back seq is; paging continues both ways from
+        there and send_message() restores the tail. Only done with nothing
+        streaming into the conversation, so no StreamContext points into
+        the replaced list.
+        """
+        rows = self.store.load_messages_from(conversation.id, HISTORY_PAGE, max(0, seq - HISTORY_PAGE // 4))
+        if not rows:
+            return
+        conversation.messages = self.stored_messages(rows)
+        conversation.heights = PrefixSums()
+        conversation.loaded = True
+        conversation.first_seq = rows[0][0]
+        later = rows[-1][0] + 1
+        conversation.later_seq = later if later < conversation.next_seq else None
+
+    def page_later(self, conversation):
+        """Append up to HISTORY_PAGE newer stored messages; returns how many."""
+        rows = self.store.load_messages_from(conversation.id, HISTORY_PAGE, conversation.later_seq)
+        conversation.messages.extend(self.stored_messages(rows))
+        later = rows[-1][0] + 1 if rows else conversation.next_seq
+        conversation.later_seq = later if later < conversation.next_seq else None
+        return len(rows)
+
+    def load_later(self):
+        conversation = self.active
+        if conversation.later_seq is None:
+            return
+        self.watchdog.poke()
+        added = self.page_later(conversation)
+        if added:
+            self.transcript.appended(conversation, added)
+
+    def reload_tail(self, conversation):
+        """Drop a windowed view and load the newest page again."""
+        conversation.messages = []
+        conversation.heights = PrefixSums()
+        conversation.first_seq = conversation.next_seq
+        conversation.later_seq = None
+        self.page_in(conversation)
+        self.transcript.load(conversation)
+
+    def run_search(self):
+        self.watchdog.poke()                      # FTS query on the Tk thread
+        query = self.search_entry.get().strip()
+        self.search_hits = self.store.search(query) if self.store and query else []
+        self.search_results.delete(0, tk.END)
+        for conversation_id, seq, sender, title, snippet in self.search_hits:
+            self.search_results.insert(tk.END, f"{title[:14]} · {snippet}")
+        if self.search_hits:
+            self.search_results.pack(anchor="w", padx=30, pady=5, fill="x", after=self.search_entry)
+        else:
+            self.search_results.pack_forget()
+
+    def on_search_select(self, event):
+        selection = self.search_results.curselection()
+        if selection:
+            conversation_id, seq = self.search_hits[selection[0]][:2]
+            self.jump_to_message(conversation_id, seq)
+
+    def jump_to_message(self, conversation_id, seq):
+        conversation = next((c for c in self.conversations if c.id == conversation_id), None)
+        if conversation is None:
+            return
+        self.watchdog.poke()
+        if conversation is not self.active:
+            self.switch_conversation(conversation)
+        if not conversation.first_seq <= seq < (conversation.later_seq or conversation.next_seq):
+            if conversation.in_flight:
+                # Streams write into the tail by index; don't swap it out under them
+                self.update_status("That message is further back: jump again once the reply finishes.")
+                return
+            self.page_around(conversation, seq)
+        seqs = [m.seq if m.seq is not None else -1 for m in conversation.messages]
+        index = min(bisect.bisect_left(seqs, seq), len(seqs) - 1)
+        if index >= 0:
+            self.transcript.load(conversation, top_index=index)
+
+    def switch_conversation(self, conversation):
+        self.watchdog.poke()                      # page_in() and a full transcript load
+        self.active = conversation
+        if not conversation.loaded:
+            self.page_in(conversation)
+        self.transcript.load(conversation)
+        position = self.conversations.index(conversation)
+        self.chat_list.selection_clear(0, tk.END)
+        self.chat_list.selection_set(position)
+
+    def on_chat_select(self, event):
+        selection = self.chat_list.curselection()
+        if selection and self.conversations[selection[0]] is not self.active:
+            self.switch_conversation(self.conversations[selection[0]])
+
+    def refresh_chat_title(self, conversation):
+        position = self.conversations.index(conversation)
+        marker = "● " if conversation.in_flight else ""
+        self.chat_list.delete(position)
+        self.chat_list.insert(position, marker + conversation.title)
+        if conversation is self.active:
+            self.chat_list.selection_set(position)
+
     def send_message(self):
-        query = self.entry.get().strip()
+        query = self.composer.get().strip()
         if not query or not self.engine.is_ready:
             return
-        self.entry.delete(0, tk.END)
-        self.add_bubble("YOU", query, False)
-        self.active_thought_block = None
-        self.active_answer_label = None
-        self.current_wrapper = self.create_bot_wrapper()
-        threading.Thread(
-            target=self.engine.generate,
-            args=(query, self.msg_queue),
-            daemon=True
-        ).start()
-
-    def add_bubble(self, sender, text, is_bot):
-        wrapper = tk.Frame(self.scroll_frame, bg=self.colors["bg"])
-        wrapper.pack(fill="x", anchor="w", pady=10)
+        if not self.pool.accepting:
+            # Refuse before anything is shown or stored: the prompt stays in the composer
+            self.update_status("Busy: too many queued prompts, try again shortly.")
+            return
+        self.composer.clear()
+        conversation = self.active
+        if conversation.later_seq is not None:
+            self.reload_tail(conversation)        # a search hit left a window of old messages
+        if not conversation.next_seq:
+            conversation.title = query[:32]
+            if self.store:
+                self.store.save_conversation(conversation.id, conversation.title)
+        self.add_bubble("YOU", query, False, seq=conversation.next_seq)
+        if self.store:
+            self.store.append_message(conversation.id, conversation.next_seq, "YOU", False, query)
+        conversation.next_seq += 1
+        request_id = next(self.request_ids)
+        self.streams[request_id] = self.create_bot_wrapper(request_id)
+        # Keyed by conversation: ordered within a chat, parallel across chats
+        self.pool.submit(conversation.id, self.engine.generate, query, self.msg_queue, request_id)
+        conversation.in_flight += 1
+        self.watchdog.arm()                       # held armed while something streams
+        self.refresh_chat_title(conversation)
 
-        tk.Label(
-            wrapper, text=sender,
-            font=("Arial", 8, "bold"),
-            bg=self.colors["bg"],
-            fg=self.colors["primary"] if is_bot else self.colors["text_s"]
-        ).pack(anchor="w")
-
-        bubble = tk.Label(
-            wrapper, text=text,
-            bg=self.colors["bot_bubble"] if is_bot else self.colors["user_bubble"],
-            fg="white", font=("Arial", 11),
-            justify="left", wraplength=550,
-            padx=15, pady=10
+    def persist_reply(self, stream):
+        """Store a finished reply: one row per message, never per token."""
+        if not self.store:
+            return
+        message = stream.message
+        self.store.append_message(
+            stream.conversation.id, stream.seq, message.sender, True,
+            message.text, message.thought, message.debug,
+            stream.started, stream.first_token, stream.finished
         )
-        bubble.pack(anchor="w", pady=5)
-        self.root.after(10, lambda: self.canvas.yview_moveto(1.0))
-        return bubble
 
-    def create_bot_wrapper(self):
-        wrapper = tk.Frame(self.scroll_frame, bg=self.colors["bg"])
-        wrapper.pack(fill="x", anchor="w", pady=10)
+    def stall_context(self):
+        """What the watchdog logs next to a stalled stack (runs off the Tk thread)."""
+        return {
+            "queue_depth": self.msg_queue.qsize(),
+            "pending_requests": list(self.pending_events),
+            "active_requests": list(self.streams),
+            "pool_queued": self.pool.queue_depth,
+        }
 
-        tk.Label(
-            wrapper, text="CAT R1",
-            font=("Arial", 8, "bold"),
-            bg=self.colors["bg"],
-            fg=self.colors["primary"]
-        ).pack(anchor="w")
+    def on_close(self):
+        # Workers may be waiting on this thread: signal them, never join here
+        self.watchdog.stop()
+        self.pool.shutdown(wait=False)
+        self.root.destroy()
+        if self.store:
+            self.store.close()                    # flushes queued writes; disk only
 
-        self.debug_label = tk.Label(
-            wrapper, text="",
-            font=("Courier", 8),
-            bg=self.colors["bg"],
-            fg="#10b981"
-        )
-        self.debug_label.pack(anchor="w")
-        return wrapper
+    def add_bubble(self, sender, text, is_bot, seq=None):
+        index = self.transcript.append(ChatMessage(sender, text, is_bot, seq=seq))
+        self.transcript.scroll_to_end()
+        return index
+
+    def create_bot_wrapper(self, request_id):
+        seq = self.active.next_seq
+        self.active.next_seq += 1
+        message = ChatMessage("CAT R1", "", True, thought_expanded=not self.collapse_thoughts, seq=seq)
+        message.streaming = True
+        index = self.transcript.append(message)
+        return StreamContext(request_id, self.active, index, self.transcript, seq, router=self.heatmap)
+
+    def schedule_drain(self, delay=16):
+        if self.drain_job is None:
+            self.drain_job = self.root.after(delay, self.process_queue)
+
+    def finish_stream(self, stream):
+        if stream.first_token is not None:
+            self.hud.ttft = stream.first_token - stream.started
+        del self.streams[stream.request_id]
+        if not self.streams:
+            self.watchdog.disarm()                # idle again: winds down after a few quiet beats
+        stream.conversation.in_flight -= 1
+        self.refresh_chat_title(stream.conversation)
+        self.persist_reply(stream)
 
     def process_queue(self):
+        """Drain the engine queue and apply it within one frame budget.
+
+        route/thought/answer/debug events carry the full state so far, so
+        only the newest one per (request, kind) is worth rendering. Whatever
+        does not fit in the budget stays in pending_events for the next tick,
+        which is scheduled almost immediately so Tk can repaint and handle
+        input first.
+        With nothing left the queue is rearmed and no timer stays scheduled;
+        the next engine event wakes us through <<EngineEvent>>.
+        """
+        self.drain_job = None
+        started = time.perf_counter()
+        deadline = started + self.frame_budget
+        pending = self.pending_events
+        drained = tokens = 0
+        oldest = started
         try:
             while True:
-                mode, content = self.msg_queue.get_nowait()
-                if mode == "debug":
-                    self.debug_label.config(text=content)
-                elif mode == "thought":
-                    if not self.active_thought_block:
-                        self.active_thought_block = CollapsibleThought(self.current_wrapper, self.colors)
-                        self.active_thought_block.pack(fill="x", pady=5)
-                    self.active_thought_block.update_text(content)
-                elif mode == "answer":
-                    if not self.active_answer_label:
-                        self.active_answer_label = tk.Label(
-                            self.current_wrapper, text="",
-                            bg=self.colors["bot_bubble"],
-                            fg="white", font=("Arial", 11),
-                            justify="left", wraplength=550,
-                            padx=15, pady=10
-                        )
-                        self.active_answer_label.pack(anchor="w", pady=5)
-                    self.active_answer_label.config(text=content)
-                elif mode == "done":
-                    pass
-                self.canvas.yview_moveto(1.0)
+                event = self.msg_queue.get_nowait()
+                pending.setdefault(event.request_id, {})[event.kind] = event
+                drained += 1
+                tokens += event.kind == "answer"  # the engine emits one answer event per token
+                oldest = min(oldest, event.timestamp)
         except queue.Empty:
             pass
-        finally:
-            self.root.after(50, self.process_queue)
+
+        applied = False
+        while pending and time.perf_counter() < deadline:
+            request_id = next(iter(pending))
+            events = pending.pop(request_id)
+            stream = self.streams.get(request_id)
+            if stream is None:
+                continue
+            applied = True
+            for kind in KINDS:
+                event = events.get(kind)
+                if event is not None:
+                    stream.handlers[kind](event.payload)
+            if stream.done:
+                self.finish_stream(stream)
+
+        if applied:
+            self.transcript.scroll_to_end(force=False)
+        self.hud.record_drain(drained, tokens, time.perf_counter() - started, started - oldest)
+        if pending:
+            self.schedule_drain(1)
+        elif not self.msg_queue.rearm():
+            self.schedule_drain()
 
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = CatSeekApp(root)
+    app = CatSeekApp(
+        root,
+        renderer="text" if "--text" in sys.argv else "virtual",
+        collapse_thoughts="--collapse-thoughts" in sys.argv,
+        show_hud="--hud" in sys.argv
+    )
     root.mainloop()
@@ -4,6 +4,12 @@ import threading
 import time
 import random
 import sys
+import json
+import tempfile
+
+from catevents import EventEmitter
+from catpool import GenerationPool
+from catui import CanvasReflow, Composer, UIDispatcher, thought_header
 
 # =============================================================================
 # CAT R1 - LOCAL WHITEPAPER ARCHITECTURE
@@ -14,6 +20,7 @@ import sys
 class R1LocalLogicEngine:
     def __init__(self):
         self.is_ready = False
+        self.context_length = 4096                # max prompt tokens
 
     def boot_sequence(self, status_callback):
         steps = [
@@ -29,8 +36,9 @@ class R1LocalLogicEngine:
         self.is_ready = True
 
     def generate_response(self, query):
+        emit = EventEmitter().emit
         selected = random.sample(range(1, 65), 4)
-        yield ("debug", f"DEBUG: Routing through experts {selected}\n")
+        yield emit("debug", f"DEBUG: Routing through experts {selected}\n")
 
         thoughts = [
             f"Query: '{query}'. Analyzing constraints.",
@@ -45,7 +53,7 @@ class R1LocalLogicEngine:
         current_thought = ""
         for t in thoughts:
             current_thought += f"● {t}\n"
-            yield ("thought", current_thought)
+            yield emit("thought", current_thought)
             time.sleep(0.3)
 
         finals = [
@@ -59,26 +67,93 @@ class R1LocalLogicEngine:
         current = ""
         for char in answer:
             current += char
-            yield ("answer", current)
+            yield emit("answer", current)
             time.sleep(0.01)
+        yield emit("done")
+
+
+RETAIN = 200                                      # bubbles kept as live widgets
+SPILL_BATCH = 50                                  # evicted together, once RETAIN is exceeded by this
+REHYDRATE_PAGE = 50                               # bubbles restored per scroll to the top
+
+
+class SpillArchive:
+    """Append-only temp file of messages whose widgets were destroyed.
+
+    Record i is message i of the session; only byte offsets stay in memory.
+    """
+    def __init__(self):
+        self.file = tempfile.TemporaryFile(prefix="catr1-spill-")
+        self.offsets = []
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def extend(self, records):
+        self.file.seek(0, 2)
+        lines = []
+        position = self.file.tell()
+        for record in records:
+            line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+            self.offsets.append(position)
+            position += len(line)
+            lines.append(line)
+        self.file.write(b"".join(lines))
+
+    def read(self, start, stop):
+        self.file.seek(self.offsets[start])
+        return [json.loads(self.file.readline()) for _ in range(start, stop)]
+
+    def close(self):
+        self.file.close()
+
+
+class TranscriptEntry:
+    """One bubble on screen and what is needed to archive it."""
+    __slots__ = ("wrapper", "sender", "is_bot", "widgets", "done")
+
+    def __init__(self, wrapper, sender, is_bot, widgets, done=True):
+        self.wrapper = wrapper
+        self.sender = sender
+        self.is_bot = is_bot
+        self.widgets = widgets                    # (bubble,) or (debug, thought, answer)
+        self.done = done                          # bot replies: generation finished
+
+    def record(self):
+        """[sender, is_bot, text, thought, debug] as read back from the widgets."""
+        if not self.is_bot:
+            return [self.sender, False, self.widgets[0].cget("text"), "", ""]
+        debug_label, thought_block, answer_label = self.widgets
+        return [self.sender, True, answer_label.cget("text"), thought_block.content,
+                debug_label.cget("text")]
 
 
 class ThinkBlock(tk.Frame):
-    """Collapsible reasoning block — no rogue Tk() calls."""
-    def __init__(self, parent, colors):
+    """Collapsible reasoning block — no rogue Tk() calls.
+
+    Click the header to collapse. While collapsed only the header counter is
+    updated; the thought text is rendered once when it is expanded again.
+    """
+    def __init__(self, parent, colors, collapsed=False):
         super().__init__(parent, bg=colors["bg"], pady=5)
         self.colors = colors
+        self.is_expanded = not collapsed
+        self.content = ""
+        self.dirty = False
 
         # ✅ FIX: use sys.platform instead of tk.Tk().tk.call(...)
         mono = "Menlo" if sys.platform == "darwin" else (
             "Consolas" if sys.platform == "win32" else "DejaVu Sans Mono"
         )
 
-        tk.Label(
-            self, text="▼ Thought Process",
+        self.header = tk.Label(
+            self, text=self.header_text(),
             font=("Arial", 9, "bold italic"),
-            bg=colors["bg"], fg=colors["primary"], anchor="w"
-        ).pack(fill="x")
+            bg=colors["bg"], fg=colors["primary"], anchor="w",
+            cursor="hand2"
+        )
+        self.header.pack(fill="x")
+        self.header.bind("<Button-1>", self.toggle)
 
         self.text_label = tk.Label(
             self, text="",
@@ -87,20 +162,50 @@ class ThinkBlock(tk.Frame):
             justify="left", anchor="w", padx=10, pady=10,
             wraplength=550
         )
-        self.text_label.pack(fill="x", pady=2)
+        if self.is_expanded:
+            self.text_label.pack(fill="x", pady=2)
+
+    def header_text(self):
+        return thought_header(self.content, self.is_expanded)
+
+    def toggle(self, event=None):
+        self.is_expanded = not self.is_expanded
+        if self.is_expanded:
+            if self.dirty:
+                self.text_label.config(text=self.content)
+                self.dirty = False
+            self.text_label.pack(fill="x", pady=2)
+        else:
+            self.text_label.pack_forget()
+        self.header.config(text=self.header_text())
 
     def update_text(self, content):
-        self.text_label.config(text=content)
+        self.content = content
+        self.header.config(text=self.header_text())
+        if self.is_expanded:
+            self.text_label.config(text=content)
+        else:
+            self.dirty = True
 
 
 class CatR1App:
-    def __init__(self, root):
+    def __init__(self, root, collapse_thoughts=False):
         self.root = root
+        self.collapse_thoughts = collapse_thoughts
         self.root.title("Cat R1 - Local Reasoning Engine")
         self.root.geometry("1000x700")
         self.root.configure(bg="#050505")
 
         self.engine = R1LocalLogicEngine()
+        self.ui = UIDispatcher(self.root)
+        self.pool = GenerationPool(workers=2)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Only the newest bubbles are widgets; older ones live in the spill file
+        self.live = []                            # TranscriptEntry, oldest first
+        self.first_live = 0                       # session index of live[0]
+        self.spill = SpillArchive()
+        self.rehydrate_pending = False
 
         self.colors = {
             "bg":         "#050505",
@@ -157,45 +262,44 @@ class CatR1App:
         self.scroll_frame = tk.Frame(self.canvas, bg=self.colors["bg"])
         self.scrollbar = ttk.Scrollbar(self.main_container, orient="vertical", command=self.canvas.yview)
 
-        self.canvas.create_window((0, 0), window=self.scroll_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.frame_window = self.canvas.create_window((0, 0), window=self.scroll_frame, anchor="nw")
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+        self.spill_notice = tk.Label(
+            self.scroll_frame, text="", font=("Arial", 8, "italic"),
+            bg=self.colors["bg"], fg=self.colors["text_s"]
+        )
 
         self.scrollbar.pack(side="right", fill="y")
         self.canvas.pack(side="top", fill="both", expand=True, padx=20, pady=10)
 
-        self.scroll_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
+        self.wrap = CanvasReflow(self.canvas, self.frame_window, self.scroll_frame)
 
         # --- Input bar ---
         input_bar = tk.Frame(self.main_container, bg=self.colors["bg"], pady=20, padx=20)
         input_bar.pack(side="bottom", fill="x")
 
-        self.entry = tk.Entry(
-            input_bar, bg=self.colors["input_bg"], fg="white",
-            insertbackground="white", font=("Arial", 11), relief="flat",
-            highlightthickness=1,
-            highlightbackground=self.colors["border"],
-            highlightcolor=self.colors["primary"]
+        self.composer = Composer(
+            input_bar, on_submit=self.handle_send,
+            context_length=self.engine.context_length,
+            bg=self.colors["input_bg"], fg="white", font=("Arial", 11),
+            accent=self.colors["primary"], border=self.colors["border"]
         )
-        self.entry.pack(side="left", fill="x", expand=True, ipady=8, padx=(0, 10))
-        self.entry.bind("<Return>", lambda e: self.handle_send())
+        self.composer.pack(side="left", fill="x", expand=True, padx=(0, 10))
 
         tk.Button(
             input_bar, text="Send",
             bg=self.colors["primary"], fg="white",
             activebackground="#2563eb", relief="flat",
             font=("Arial", 10, "bold"),
-            command=self.handle_send, padx=20
+            command=self.composer.submit, padx=20
         ).pack(side="right")
 
     def update_status(self, msg):
         self.root.after(0, lambda: self.status_label.config(text=msg))
 
-    def add_bubble(self, sender, text="", is_bot=False):
+    def add_bubble(self, sender, text="", is_bot=False, before=None):
         wrapper = tk.Frame(self.scroll_frame, bg=self.colors["bg"], pady=10)
-        wrapper.pack(fill="x", anchor="w")
+        wrapper.pack(fill="x", anchor="w", before=before)
 
         tk.Label(
             wrapper, text=sender, font=("Arial", 8, "bold"),
@@ -207,23 +311,117 @@ class CatR1App:
             wrapper, text=text,
             bg=self.colors["bot_bubble"] if is_bot else self.colors["user_bubble"],
             fg="white", font=("Arial", 10),
-            justify="left", wraplength=600, padx=12, pady=8
+            justify="left", wraplength=self.wrap.width, padx=12, pady=8
         )
         bubble.pack(anchor="w", pady=2)
-        self.root.after(10, lambda: self.canvas.yview_moveto(1.0))
-        return bubble
+        self.wrap.add(bubble)
+        if before is None:
+            self.root.after(10, lambda: self.canvas.yview_moveto(1.0))
+        return TranscriptEntry(wrapper, sender, is_bot, (bubble,))
 
     def handle_send(self):
-        query = self.entry.get().strip()
+        query = self.composer.get().strip()
         if not query or not self.engine.is_ready:
             return
-        self.entry.delete(0, tk.END)
-        self.add_bubble("YOU", query, False)
-        threading.Thread(target=self.run_inference, args=(query,), daemon=True).start()
+        if not self.pool.accepting:
+            self.update_status("Busy: too many queued prompts, try again shortly.")
+            return
+        self.composer.clear()
+        self.live.append(self.add_bubble("YOU", query, False))
+        entry = self.create_bot_bubble()
+        entry.done = False
+        self.live.append(entry)
+        self.pool.submit("main", self.run_inference, query, entry)
+        self.trim_transcript()
+
+    def on_close(self):
+        self.pool.shutdown(wait=False)            # workers may be waiting on this thread
+        self.root.destroy()
+        self.spill.close()
+
+    # --- Retention: spill old bubbles to disk, bring them back on scroll ---
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(first) <= 0 and self.first_live and not self.rehydrate_pending:
+            self.rehydrate_pending = True
+            self.root.after_idle(self.rehydrate)
+        elif float(last) >= 0.999 and len(self.live) > RETAIN + SPILL_BATCH:
+            self.root.after_idle(self.trim_transcript)   # back at the bottom after browsing
+
+    def trim_transcript(self):
+        """Archive and destroy the oldest finished bubbles past RETAIN.
+
+        Skipped while the user is scrolled up reading old messages; the
+        trim happens once they return to the bottom.
+        """
+        if len(self.live) <= RETAIN + SPILL_BATCH or self.canvas.yview()[1] < 0.999:
+            return
+        count = 0
+        for entry in self.live[:len(self.live) - RETAIN]:
+            if not entry.done:
+                break
+            count += 1
+        if not count:
+            return
+        evicted = self.live[:count]
+        del self.live[:count]
+        # Bubbles that were rehydrated are already on disk
+        archived = len(self.spill) - self.first_live
+        self.spill.extend(entry.record() for entry in evicted[max(0, archived):])
+        for entry in evicted:
+            entry.wrapper.destroy()
+        self.first_live += count
+        self.wrap.prune()
+        self.show_spill_notice()
+
+    def rehydrate(self):
+        """Rebuild the REHYDRATE_PAGE bubbles just above the oldest live one."""
+        self.rehydrate_pending = False
+        if not self.first_live:
+            return
+        start = max(0, self.first_live - REHYDRATE_PAGE)
+        anchor = self.live[0].wrapper if self.live else None
+        entries = []
+        for sender, is_bot, text, thought, debug in self.spill.read(start, self.first_live):
+            if not is_bot:
+                entries.append(self.add_bubble(sender, text, False, before=anchor))
+                continue
+            entry = self.create_bot_bubble(before=anchor)
+            debug_label, thought_block, answer_label = entry.widgets
+            debug_label.config(text=debug)
+            thought_block.update_text(thought)
+            answer_label.config(text=text)
+            entries.append(entry)
+        self.live[0:0] = entries
+        self.first_live = start
+        self.show_spill_notice()
+
+        if anchor is not None and entries:
+            # Keep the message the user was looking at in place once pack has
+            # moved it down; pack resizes scroll_frame before it moves children
+            offset = anchor.winfo_y() - self.canvas.canvasy(0)
+            binding = None
+
+            def restore(event):
+                anchor.unbind("<Configure>", binding)
+                height = max(self.scroll_frame.winfo_height(), 1)
+                self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+                self.canvas.yview_moveto((anchor.winfo_y() - offset) / height)
+
+            binding = anchor.bind("<Configure>", restore, add="+")
+
+    def show_spill_notice(self):
+        if not self.first_live:
+            self.spill_notice.pack_forget()
+            return
+        self.spill_notice.config(text=f"↑ {self.first_live:,} earlier messages archived · scroll up to load")
+        self.spill_notice.pack(pady=5, before=self.live[0].wrapper)
 
-    def run_inference(self, query):
+    def create_bot_bubble(self, before=None):
+        # Runs on the Tk thread; the worker only ever gets handles to these widgets
         wrapper = tk.Frame(self.scroll_frame, bg=self.colors["bg"], pady=10)
-        wrapper.pack(fill="x", anchor="w")
+        wrapper.pack(fill="x", anchor="w", before=before)
 
         tk.Label(
             wrapper, text="CAT R1", font=("Arial", 8, "bold"),
@@ -234,28 +432,38 @@ class CatR1App:
                                bg=self.colors["bg"], fg="#10b981")
         debug_label.pack(anchor="w")
 
-        thought_block = ThinkBlock(wrapper, self.colors)
+        thought_block = ThinkBlock(wrapper, self.colors, collapsed=self.collapse_thoughts)
         thought_block.pack(fill="x", anchor="w", pady=5)
 
         answer_label = tk.Label(
             wrapper, text="",
             bg=self.colors["bot_bubble"], fg="white",
             font=("Arial", 10), justify="left",
-            wraplength=600, padx=12, pady=8
+            wraplength=self.wrap.width, padx=12, pady=8
         )
         answer_label.pack(anchor="w")
-
-        for mode, content in self.engine.generate_response(query):
-            if mode == "debug":
-                self.root.after(0, lambda c=content: debug_label.config(text=c))
-            elif mode == "thought":
-                self.root.after(0, lambda c=content: thought_block.update_text(c))
-            elif mode == "answer":
-                self.root.after(0, lambda c=content: answer_label.config(text=c))
-            self.root.after(0, lambda: self.canvas.yview_moveto(1.0))
+        thought_block.text_label.config(wraplength=self.wrap.width - 50)
+        self.wrap.add(thought_block.text_label, -50)
+        self.wrap.add(answer_label)
+        if before is None:
+            self.root.after(10, lambda: self.canvas.yview_moveto(1.0))
+        return TranscriptEntry(wrapper, "CAT R1", True, (debug_label, thought_block, answer_label))
+
+    def run_inference(self, query, entry):
+        debug_label, thought_block, answer_label = entry.widgets
+        setters = {
+            "debug": lambda c: debug_label.config(text=c),
+            "thought": thought_block.update_text,
+            "answer": lambda c: answer_label.config(text=c),
+            "done": lambda c: setattr(entry, "done", True),
+        }
+        # One coalesced main-thread flush per frame instead of 3 after() calls per token
+        for event in self.engine.generate_response(query):
+            self.ui.update((answer_label, event.kind), setters[event.kind], event.payload)
+            self.ui.update("scroll", self.canvas.yview_moveto, 1.0)
 
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = CatR1App(root)
+    app = CatR1App(root, collapse_thoughts="--collapse-thoughts" in sys.argv)
     root.mainloop()